@@ -0,0 +1,55 @@
+#!/usr/bin/python
+
+# Benchmark: poll cycles of a fleet with some hanging plugs, with and
+# without a circuit-breaker per plug. Without a breaker, every cycle waits
+# for the read-timeout of the hanging plugs.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+import os, sys
+import time
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__), ".."))
+from ediplug import *
+
+PLUGS   = 8
+HANGING = 2
+TIMEOUT = 0.5
+CYCLES  = 10
+
+def cycles(plugs,breaker):
+  for plug in plugs.values():
+    plug.setBreaker(CircuitBreaker(threshold=1,cooldown=60) if breaker
+                                                                 else None)
+  fleet = Fleet(plugs,workers=len(plugs))
+  times = []
+  for i in range(CYCLES):
+    start = time.time()
+    results = fleet.getPowerState()
+    times.append(time.time()-start)
+  fleet.shutdown()
+  ok = len([r for r in results.values() if r['ok']])
+  return times, ok
+
+if __name__ == "__main__":
+  live    = Simulator(PLUGS).start()
+  hanging = Simulator(HANGING,latency=10*TIMEOUT).start()
+  session = PlugSession(poolConnections=PLUGS+HANGING,
+                        connectTimeout=TIMEOUT,readTimeout=TIMEOUT)
+  plugs = {}
+  for i, (host,port) in enumerate(live.getAddresses() +
+                                  hanging.getAddresses()):
+    plugs["plug%d" % i] = SP2101W(host,port,session=session)
+
+  print "%d plugs, %d hanging, read-timeout %.1fs, %d cycles" % (
+                                  PLUGS+HANGING,HANGING,TIMEOUT,CYCLES)
+  for name, breaker in [('without breaker',False),('with breaker',True)]:
+    times, ok = cycles(plugs,breaker)
+    print "%-16s first: %6.3fs  others (mean): %6.3fs  ok: %d" % (
+                   name,times[0],sum(times[1:])/(CYCLES-1),ok)
+  live.stop()
+  hanging.stop()
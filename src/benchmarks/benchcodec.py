@@ -0,0 +1,157 @@
+#!/usr/bin/python
+
+# Benchmark: building command documents and parsing responses with minidom
+# (the original implementation) compared to Codec. The responses are
+# modelled on responses captured from SP1101W/SP2101W plugs. Before timing,
+# the script checks that both implementations produce identical requests
+# and results.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+import os, sys
+import timeit
+from xml.dom.minidom import getDOMImplementation
+from xml.dom.minidom import parseString
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__), ".."))
+from ediplug import *
+
+HEADER = '<?xml version="1.0" encoding="UTF8"?>\n<SMARTPLUG id="edimax">'
+
+RESPONSES = {
+  'Device.System.Power.State': HEADER +
+    '<CMD id="get"><Device.System.Power.State>ON</Device.System.Power.State>'
+    '</CMD></SMARTPLUG>\n',
+  'NOW_POWER': HEADER +
+    '<CMD id="get"><NOW_POWER>'
+    '<Device.System.Power.LastToggleTime>20161018084402'
+    '</Device.System.Power.LastToggleTime>'
+    '<Device.System.Power.NowCurrent>0.2201</Device.System.Power.NowCurrent>'
+    '<Device.System.Power.NowPower>27.60</Device.System.Power.NowPower>'
+    '<Device.System.Power.NowEnergy.Day>0.412</Device.System.Power.NowEnergy.Day>'
+    '<Device.System.Power.NowEnergy.Week>2.854</Device.System.Power.NowEnergy.Week>'
+    '<Device.System.Power.NowEnergy.Month>11.377'
+    '</Device.System.Power.NowEnergy.Month>'
+    '</NOW_POWER></CMD></SMARTPLUG>\n',
+  'SYSTEM_INFO': HEADER +
+    '<CMD id="get"><SYSTEM_INFO>'
+    '<Run.Cus>Edimax</Run.Cus><Run.Model>SP2101W</Run.Model>'
+    '<Run.FW.Version>1.03</Run.FW.Version>'
+    '<Run.LAN.Client.MAC.Address>801F02C0FFEE</Run.LAN.Client.MAC.Address>'
+    '<Device.System.SMTP.0.Server.Address></Device.System.SMTP.0.Server.Address>'
+    '<Device.System.SMTP.0.Server.Port>25</Device.System.SMTP.0.Server.Port>'
+    '<Device.System.TimeZone.Zone>Europe/Berlin</Device.System.TimeZone.Zone>'
+    '<Device.System.Name>kitchen</Device.System.Name>'
+    '<SUPPORT><Device.System.SMTP.Support>1</Device.System.SMTP.Support>'
+    '<Device.System.Power.Schedule.Support>1'
+    '</Device.System.Power.Schedule.Support></SUPPORT>'
+    '</SYSTEM_INFO></CMD></SMARTPLUG>\n',
+  'SCHEDULE': HEADER +
+    '<CMD id="get"><SCHEDULE>' +
+    ''.join(['<Device.System.Power.Schedule.%d value="ON">%s'
+             '</Device.System.Power.Schedule.%d>' %
+             (d,120*'0'+135*'F'+105*'0',d) for d in range(7)]) +
+    '</SCHEDULE></CMD></SMARTPLUG>\n',
+  }
+
+# original minidom implementation   ----------------------------------------
+
+def minidomRequest(cmdType,tag,value=None):
+  doc = getDOMImplementation().createDocument(None, "SMARTPLUG", None)
+  doc.documentElement.setAttribute("id", "edimax")
+  cmdElem = doc.createElement("CMD")
+  cmdElem.setAttribute("id", cmdType)
+  doc.documentElement.appendChild(cmdElem)
+  childElem = doc.createElement(tag)
+  cmdElem.appendChild(childElem)
+  if value is not None:
+    childElem.appendChild(doc.createTextNode(value))
+  return doc.toxml()
+
+def minidomPowerInfo(text):
+  dom = parseString(text)
+  info = {}
+  for tag in dom.getElementsByTagName("NOW_POWER")[0].childNodes:
+    if tag.hasChildNodes():
+      info[tag.tagName] = tag.firstChild.nodeValue
+  return info
+
+def minidomPowerState(text):
+  dom = parseString(text)
+  return dom.getElementsByTagName("Device.System.Power.State")[0].\
+                                                firstChild.nodeValue == 'ON'
+
+def minidomSysInfo(text):
+  dom = parseString(text)
+  info = {}
+  for tag in dom.getElementsByTagName("SYSTEM_INFO")[0].childNodes:
+    if tag.tagName == "SUPPORT":
+      for supportTag in tag.childNodes:
+        info[supportTag.tagName] = supportTag.firstChild.nodeValue
+    elif tag.hasChildNodes():
+      info[tag.tagName] = tag.firstChild.nodeValue
+  return info
+
+def minidomSchedule(text):
+  dom = parseString(text)
+  sched = Schedule()
+  for tag in dom.getElementsByTagName("SCHEDULE")[0].childNodes:
+    sched.fromTransport(tag.firstChild.nodeValue,int(tag.tagName[-1]))
+  return sched
+
+# Codec implementation (as used by Plug)   ---------------------------------
+
+PLUG = SP2101W('localhost')
+
+def codecRequest(cmdType,tag,value=None):
+  if cmdType == 'get' and value is None:
+    return Codec.query(tag)
+  return Codec.document(cmdType,Codec.element(tag,value))
+
+def codecPowerInfo(text):
+  return PLUG._parsePowerInfo(Codec.parse(text))
+
+def codecPowerState(text):
+  return PLUG._parsePowerState(Codec.parse(text))
+
+def codecSysInfo(text):
+  return PLUG._parseSysInfo(Codec.parse(text))
+
+def codecSchedule(text):
+  return PLUG._parseSchedule(Codec.parse(text))
+
+# operations to compare: (name, minidom, codec, args)   ---------------------
+
+OPERATIONS = [
+  ('request get',   minidomRequest, codecRequest,
+                                  ('get','Device.System.Power.State')),
+  ('request setup', minidomRequest, codecRequest,
+                                  ('setup','Device.System.Power.State','ON')),
+  ('power-state',   minidomPowerState, codecPowerState,
+                                  (RESPONSES['Device.System.Power.State'],)),
+  ('power-info',    minidomPowerInfo, codecPowerInfo,
+                                  (RESPONSES['NOW_POWER'],)),
+  ('system-info',   minidomSysInfo, codecSysInfo,
+                                  (RESPONSES['SYSTEM_INFO'],)),
+  ('schedule',      minidomSchedule, codecSchedule,
+                                  (RESPONSES['SCHEDULE'],)),
+  ]
+
+NUMBER = 2000
+
+def bench(fn,args):
+  return NUMBER/min(timeit.Timer(lambda: fn(*args)).repeat(3,NUMBER))
+
+if __name__ == "__main__":
+  for name, old, new, args in OPERATIONS:
+    assert old(*args) == new(*args), name
+  print "check: requests and results identical"
+  print
+  print "%-16s %12s %12s" % ('', 'minidom', 'Codec')
+  for name, old, new, args in OPERATIONS:
+    before, after = bench(old,args), bench(new,args)
+    print "%-16s %10.0f/s %10.0f/s  %6.1fx" % (name,before,after,after/before)
@@ -0,0 +1,47 @@
+#!/usr/bin/python
+
+# Benchmark: switching a number of plugs off and uploading an exclusive
+# schedule one plug after the other compared to a Fleet.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+import os, sys
+import time
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__), ".."))
+from ediplug import *
+
+PLUGS   = 32
+LATENCY = 0.02
+
+def sequential(plugs,start,end):
+  for plug in plugs.values():
+    plug.setPowerState(False)
+    plug.setExclusiveState(start,end,False)
+
+def fleet(plugs,start,end):
+  f = Fleet(plugs,workers=PLUGS,timeout=5,retries=1)
+  f.setPowerState(False)
+  results = f.setExclusiveState(start,end,False)
+  f.shutdown()
+  return results
+
+if __name__ == "__main__":
+  sim   = Simulator(PLUGS,latency=LATENCY).start()
+  plugs = sim.getPlugs()
+  start, end = TPoint(TPoint.MON,22,0), TPoint(TPoint.TUE,6,0)
+
+  t0 = time.time()
+  sequential(plugs,start,end)
+  t1 = time.time()
+  results = fleet(plugs,start,end)
+  t2 = time.time()
+  print "%d plugs, %d ms latency" % (PLUGS,LATENCY*1000)
+  print "sequential: %6.3fs" % (t1-t0)
+  print "Fleet:      %6.3fs (%d ok)" % (t2-t1,
+                        len([r for r in results.values() if r['ok']]))
+  sim.stop()
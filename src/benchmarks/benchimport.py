@@ -0,0 +1,70 @@
+#!/usr/bin/python
+
+# Benchmark: time of "from ediplug import *" in a fresh interpreter compared
+# to importing the modules the package used to load eagerly (requests and
+# the discovery modules). The script also serves as regression test: it
+# fails (exit code 1) if the import or creating a plug loads one of the
+# lazy modules or if the import takes longer than the given limit.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+import os, sys
+import subprocess
+import argparse
+
+SRC   = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RUNS  = 10
+
+# modules which must not be loaded by "from ediplug import *" and Plug()  --
+
+LAZY = ['requests','netifaces','netaddr','socket','BaseHTTPServer',
+        'xml.sax']
+
+# code executed in the fresh interpreter   ----------------------------------
+
+CODE = """
+import sys, time
+start = time.time()
+%s
+from ediplug import *
+print time.time() - start
+Plug('127.0.0.1')
+print ' '.join([name for name in %r if name in sys.modules])
+"""
+
+def measure(preload):
+  best   = None
+  loaded = []
+  for i in range(RUNS):
+    output = subprocess.check_output(
+      [sys.executable,'-c',CODE % (preload,LAZY)],cwd=SRC)
+    lines  = output.split('\n')
+    best   = min(best,float(lines[0])) if best is not None else \
+                                                             float(lines[0])
+    loaded = lines[1].split()
+  return best, loaded
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description='import time of ediplug')
+  parser.add_argument('-m', '--max-ms', type=float, default=None,
+                      help='fail if the import takes longer (milliseconds)')
+  args = vars(parser.parse_args())
+
+  eager, _      = measure('; '.join(['import ' + name for name in LAZY]))
+  lazy,  loaded = measure('')
+  print "eager dependencies: %6.1f ms" % (eager*1000)
+  print "lazy dependencies:  %6.1f ms" % (lazy*1000)
+  print "speedup:            %6.2fx" % (eager/lazy)
+
+  failed = False
+  if loaded:
+    print "FAILED: import or Plug() loads %s" % ', '.join(loaded)
+    failed = True
+  if args['max_ms'] is not None and lazy*1000 > args['max_ms']:
+    print "FAILED: import takes longer than %.1f ms" % args['max_ms']
+    failed = True
+  sys.exit(1 if failed else 0)
@@ -0,0 +1,51 @@
+#!/usr/bin/python
+
+# Benchmark: overhead of Metrics. Requests per second of a plug without
+# metrics compared to a plug recording metrics (with and without a
+# callback), and the cost of a single Metrics.record call.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+import os, sys
+import time
+import timeit
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__), ".."))
+from ediplug import *
+
+COUNT = 1000
+
+def run(plug,count):
+  start = time.time()
+  for i in range(count):
+    plug.getPowerState()
+  return count/(time.time()-start)
+
+if __name__ == "__main__":
+  sim = Simulator().start()
+  host, port = sim.getAddresses()[0]
+  session = PlugSession()
+
+  plug = SP2101W(host,port,session=session)
+  run(plug,100)                                   # warm up
+  off = run(plug,COUNT)
+  plug.setMetrics(Metrics())
+  on  = run(plug,COUNT)
+  metrics = Metrics()
+  metrics.addCallback(lambda event: None)
+  plug.setMetrics(metrics)
+  callback = run(plug,COUNT)
+
+  print "without metrics:   %8.1f req/s" % off
+  print "with metrics:      %8.1f req/s" % on
+  print "with callback:     %8.1f req/s" % callback
+  metrics = Metrics()
+  number  = 100000
+  record  = min(timeit.repeat(lambda: metrics.record('plug','get:NOW_POWER',
+                  None,0.002,0.0001,200,300,200),number=number,repeat=3))
+  print "Metrics.record:    %8.2f us" % (record/number*1e6)
+  sim.stop()
@@ -0,0 +1,37 @@
+#!/usr/bin/python
+
+# Benchmark: sequential compared to concurrent PlugFinder.search on a
+# simulated subnet. Virtual plugs listen on some addresses of 127.0.0.0/25,
+# every plug answers with the given latency.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+import os, sys
+import time
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__), ".."))
+from ediplug import *
+
+PORT    = 18000
+NETWORK = '127.0.0.0/25'
+PLUGS   = 16
+LATENCY = 0.02
+
+def run(workers):
+  pf = PlugFinder(port=PORT,session=PlugSession(poolConnections=PLUGS))
+  start = time.time()
+  plugs = pf.search(NETWORK,workers=workers)
+  return (len(plugs),time.time()-start)
+
+if __name__ == "__main__":
+  sim = Simulator(hosts=['127.0.0.%d' % (8*i+1) for i in range(PLUGS)],
+                  port=PORT,latency=LATENCY).start()
+  for workers in [1,8,32,64]:
+    count, duration = run(workers)
+    print "workers: %2d  plugs found: %d  time: %6.3fs" % (workers,count,
+                                                           duration)
+  sim.stop()
@@ -0,0 +1,183 @@
+#!/usr/bin/python
+
+# Micro-benchmarks for Schedule: memory and operations per second of the
+# current implementation compared to the original list-based one.
+# Before timing, both implementations are checked to return identical
+# results for random operations.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+import os, sys
+import random
+import timeit
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__), ".."))
+from ediplug import *
+from legacyschedule import ListSchedule
+
+CHECKS = 500
+
+# random timepoint (with a bias towards day boundaries)   ------------------
+
+def randomTPoint():
+  if random.random() < 0.3:
+    return TPoint.create(1440*random.randrange(7) +
+                         random.choice([0,1,1438,1439]))
+  return TPoint.create(random.randrange(10080))
+
+# active ranges of a day as (start,end) minute-index within the day   -----
+
+def activeRanges(values):
+  ranges = []
+  start = None
+  for i, val in enumerate(values + ['0']):
+    if val == '1' and start is None:
+      start = i
+    elif val == '0' and start is not None:
+      ranges.append((start,i))
+      start = None
+  return ranges
+
+# compare both implementations for a single day   -------------------------
+# Known differences of the old implementation: it ignores a switch in the
+# last minute of a day, and it drops an active range at the start of a day
+# if the previous day ends active.
+
+def compareDay(new,old,day):
+  assert new.toTransport(day) == old.toTransport(day)
+
+  values = old._ListSchedule__sched[day*1440:(day+1)*1440]
+  prev   = old._ListSchedule__sched[day*1440-1]
+
+  # switch-list: old result plus a switch in the last minute
+  switches = [(tp.getIndex(),v) for tp,v in new.getSwitchList(day)]
+  expected = [(tp.getIndex(),v) for tp,v in old.getSwitchList(day)]
+  if values[1439] <> values[1438]:
+    expected.append((day*1440+1439,values[1439]))
+  assert switches == expected
+
+  # transport-switch-list: all active ranges of the day
+  ranges = activeRanges(values)
+  expected = "-".join([TPoint.create(day*1440+s).toTransport() +
+                       (TPoint.create(day*1440+e).toTransport()
+                        if e < 1440 else TPoint(day,23,59).toTransport()) +
+                       "1" for s,e in ranges])
+  assert new.getTransportSwitchList(day) == expected
+  if not (values[0] == '1' and prev == '1') and \
+     not (values[1439] == '1' and values[1438] == '0'):
+    assert new.getTransportSwitchList(day) == old.getTransportSwitchList(day)
+
+# apply the same random operations to both schedules and compare   --------
+
+def check():
+  for i in range(CHECKS):
+    active = random.random() < 0.5
+    new, old = Schedule(active), ListSchedule(active)
+    for j in range(random.randrange(1,8)):
+      start, end, active = randomTPoint(), randomTPoint(), random.random()<0.5
+      new.setState(start,end,active)
+      old.setState(start,end,active)
+      for day in range(7):
+        compareDay(new,old,day)
+    start = TPoint.create(random.randrange(10080))
+    end   = start.createAfter(0,0,random.randrange(10080-start.getIndex()))
+    assert new.getState(start,end) == old.getState(start,end)
+    day   = random.randrange(7)
+    value = old.toTransport(day)
+    new.fromTransport(value,(day+1)%7)
+    old.fromTransport(value,(day+1)%7)
+    for day in range(7):
+      compareDay(new,old,day)
+
+# size of a schedule in bytes (including all referenced objects)   ---------
+
+def size(sched):
+  seen  = set()
+  todo  = [sched.__dict__]
+  total = 0
+  while todo:
+    obj = todo.pop()
+    if id(obj) in seen:
+      continue
+    seen.add(id(obj))
+    total += sys.getsizeof(obj)
+    if isinstance(obj,dict):
+      todo.extend(obj.values())
+    elif isinstance(obj,(list,tuple)):
+      todo.extend(obj)
+  return total
+
+# size of a schedule after typical use (queries and a payload)   ----------
+
+def usedSize(cls):
+  sched = cls(False)
+  sched.setState(TPoint(TPoint.MON,8,0),TPoint(TPoint.MON,17,0))
+  sched.setState(TPoint(TPoint.WED,8,0),TPoint(TPoint.WED,12,0))
+  sched.getState(TPoint(TPoint.TUE,6,0),TPoint(TPoint.FRI,22,0))
+  for day in range(7):
+    sched.getSwitchList(day)
+    sched.toTransport(day)
+    sched.getTransportSwitchList(day)
+  return size(sched)
+
+# time a single operation   -------------------------------------------------
+
+def bench(cls,stmt,number):
+  sched = cls(False)
+  sched.setState(TPoint(TPoint.MON,8,0),TPoint(TPoint.MON,17,0))
+  sched.setState(TPoint(TPoint.WED,8,0),TPoint(TPoint.WED,12,0))
+  env = {'s': sched, 'value': sched.toTransport(1),
+         'start': TPoint(TPoint.TUE,6,0), 'end': TPoint(TPoint.FRI,22,0)}
+  code  = compile(stmt,'<bench>','eval')
+  timer = timeit.default_timer
+  best  = None
+  for i in range(3):
+    start = timer()
+    for j in xrange(number):
+      eval(code,env)
+    duration = timer()-start
+    best = duration if best is None else min(best,duration)
+  return number/best
+
+OPERATIONS = [
+  ('setState',          's.setState(start,end,True)',          2000),
+  ('getState',          's.getState(start,end)',               2000),
+  ('getState (set)',    's.setState(start,end,True) or '
+                        's.getState(start,end)',               2000),
+  ('getSwitchList',     's.getSwitchList(1)',                  2000),
+  ('toTransport',       's.toTransport(1)',                    2000),
+  ('fromTransport',     's.fromTransport(value,2)',            2000),
+  ('payload (7 days)',  's.setState(start,end,True) or '
+                        '[(s.toTransport(d),s.getTransportSwitchList(d)) '
+                        'for d in range(7)]',                  500),
+  ('payload (cached)',  '[(s.toTransport(d),s.getTransportSwitchList(d)) '
+                        'for d in range(7)]',                  500),
+  ]
+
+if __name__ == "__main__":
+  check()
+  print "check: %d random schedules consistent" % CHECKS
+  print
+  print "%-16s %12s %12s" % ('', 'list', 'Schedule')
+  print "%-16s %12d %12d" % ('bytes', size(ListSchedule()), size(Schedule()))
+  print "%-16s %12d %12d" % ('bytes (used)', usedSize(ListSchedule),
+                             usedSize(Schedule))
+  for name, stmt, number in OPERATIONS:
+    old = bench(ListSchedule,stmt,number)
+    new = bench(Schedule,stmt,number)
+    print "%-16s %10.0f/s %10.0f/s  %6.1fx" % (name,old,new,new/old)
+
+  # diff of a working-week schedule and a copy with one change per day
+  a, b = Schedule(False), Schedule(False)
+  for d in range(1,6):
+    a.setState(TPoint(d,8,0),TPoint(d,17,0))
+    b.setState(TPoint(d,8,0),TPoint(d,17,0))
+    b.setState(TPoint(d,12,0),TPoint(d,13,0),False)
+  number = 2000
+  duration = min(timeit.repeat(lambda: a.diff(b),number=number,repeat=3))
+  print
+  print "diff (5 changes) %10.1f us" % (duration/number*1e6)
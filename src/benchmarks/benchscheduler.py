@@ -0,0 +1,103 @@
+#!/usr/bin/python
+
+# Benchmark: switching many plugs from the host with a thread per event
+# (threading.Timer) compared to the Scheduler (one heap, one thread and a
+# bounded executor). Reports lag (delay between due time and the command)
+# and the number of threads, and the cost of adding and cancelling events
+# of the Scheduler.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+import os, sys
+import time
+import random
+import threading
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__), ".."))
+from ediplug import *
+
+PLUGS  = 20                             # virtual plugs
+NAMES  = 2000                           # scheduled plugs (share the virtual)
+EVENTS = 1000
+SPAN   = 5.0                            # events are spread over SPAN seconds
+
+def events(names):
+  rnd = random.Random(42)
+  return [(rnd.choice(names),rnd.uniform(2.0,2.0+SPAN),rnd.random() < 0.5)
+                                                     for i in range(EVENTS)]
+
+def runTimers(plugs,todo):
+  lags  = []
+  lock  = threading.Lock()
+  start = time.time()
+
+  def fire(name,active,due):
+    lag = time.time() - due
+    plugs[name].setPowerState(active)
+    with lock:
+      lags.append(lag)
+
+  timers = []
+  for (name,offset,active) in todo:
+    timer = threading.Timer(start+offset-time.time(),fire,
+                            (name,active,start+offset))
+    timer.start()
+    timers.append(timer)
+  peak = threading.active_count()
+  for timer in timers:
+    timer.join()
+  return sum(lags)/len(lags), max(lags), peak
+
+def runScheduler(plugs,todo):
+  sched = Scheduler(plugs,workers=16)
+  start = time.time()
+  for (name,offset,active) in todo:
+    sched.at(name,start+offset,active)
+  sched.start()
+  peak = threading.active_count()
+  while True:
+    stats = sched.getStats()
+    if stats['fired'] + stats['coalesced'] >= EVENTS:
+      break
+    time.sleep(0.05)
+  sched.shutdown()
+  return stats['lagMean'], stats['lagMax'], peak, stats
+
+def runTimeline(plugs,count):
+  sched = Scheduler(plugs,workers=1)
+  names = sorted(plugs.keys())
+  later = time.time() + 3600
+  start = time.time()
+  ids   = [sched.at(names[i % len(names)],later+i*0.001,True)
+                                                     for i in range(count)]
+  added = time.time() - start
+  start = time.time()
+  for id in ids:
+    sched.cancel(id)
+  cancelled = time.time() - start
+  sched.shutdown()
+  return added/count, cancelled/count
+
+if __name__ == "__main__":
+  sim     = Simulator(PLUGS,latency=0.01).start()
+  virtual = sim.getPlugs(session=PlugSession(poolConnections=PLUGS,
+                                             poolSize=16)).values()
+  plugs   = dict([('plug%04d' % i,virtual[i % PLUGS]) for i in range(NAMES)])
+  todo    = events(sorted(plugs.keys()))
+
+  mean, worst, threads = runTimers(plugs,todo)
+  print "threading.Timer: lag mean %7.1f ms, max %7.1f ms, %5d threads" % (
+    mean*1000,worst*1000,threads)
+  mean, worst, threads, stats = runScheduler(plugs,todo)
+  print "Scheduler:       lag mean %7.1f ms, max %7.1f ms, %5d threads" % (
+    mean*1000,worst*1000,threads)
+  print "Scheduler:       %d fired, %d coalesced, %d errors" % (
+    stats['fired'],stats['coalesced'],stats['errors'])
+  added, cancelled = runTimeline(plugs,100000)
+  print "Scheduler:       %.1f us/event added, %.1f us/event cancelled" % (
+    added*1e6,cancelled*1e6)
+  sim.stop()
@@ -0,0 +1,42 @@
+#!/usr/bin/python
+
+# Benchmark: requests per second of Plug-commands with a new connection per
+# command (the old behaviour) compared to a pooled PlugSession.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+import os, sys
+import time
+import requests as req
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__), ".."))
+from ediplug import *
+
+COUNT = 500
+
+class OneShotSession(object):
+  """post every command with a fresh connection (old behaviour)"""
+
+  def post(self,url,auth,doc):
+    return req.post(url,auth=auth,files={'file': doc})
+
+def run(plug,count):
+  start = time.time()
+  for i in range(count):
+    plug.getPowerState()
+  return count/(time.time()-start)
+
+if __name__ == "__main__":
+  sim = Simulator().start()
+  host, port = sim.getAddresses()[0]
+
+  before = run(SP1101W(host,port,session=OneShotSession()),COUNT)
+  after  = run(SP1101W(host,port,session=PlugSession()),COUNT)
+  print "requests.post:  %8.1f req/s" % before
+  print "PlugSession:    %8.1f req/s" % after
+  print "speedup:        %8.2fx" % (after/before)
+  sim.stop()
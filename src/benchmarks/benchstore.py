@@ -0,0 +1,86 @@
+#!/usr/bin/python
+
+# Benchmark: writing power samples and querying a time-range with CSV
+# compared to PowerStore (appending every sample and with a single extend).
+# The data corresponds to one month of samples taken every 10 seconds.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+import os, sys
+import csv
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__), ".."))
+from ediplug import *
+
+ROWS  = 30*24*360
+START = 1475280000.0
+POWER = 'Device.System.Power.NowPower'
+
+def samples():
+  for i in xrange(ROWS):
+    yield {'time': START+10*i, POWER: float(i % 500)}
+
+# CSV   ---------------------------------------------------------------------
+
+def writeCSV(filename):
+  with open(filename,'wb') as f:
+    writer = csv.writer(f)
+    for sample in samples():
+      writer.writerow([sample['time'],sample[POWER]])
+
+def readCSV(filename,start,end):
+  result = []
+  with open(filename,'rb') as f:
+    for row in csv.reader(f):
+      t = float(row[0])
+      if start <= t < end:
+        result.append(float(row[1]))
+  return result
+
+# PowerStore   --------------------------------------------------------------
+
+def writeStore(path):
+  store = PowerStore(path,[POWER])
+  for sample in samples():
+    store.append('plug',sample)
+  store.close()
+
+def extendStore(path):
+  store = PowerStore(path,[POWER])
+  store.extend('plug',samples())
+  store.close()
+
+def readStore(path,start,end):
+  return PowerStore(path,[POWER]).read('plug',start,end,[POWER])[POWER]
+
+def timed(fn,*args):
+  t = time.time()
+  result = fn(*args)
+  return (time.time()-t,result)
+
+if __name__ == "__main__":
+  tmp = tempfile.mkdtemp()
+  try:
+    hour = (START+15*86400,START+15*86400+3600)
+    csvWrite, dummy   = timed(writeCSV,os.path.join(tmp,'power.csv'))
+    csvRead, old      = timed(readCSV,os.path.join(tmp,'power.csv'),*hour)
+    storeWrite, dummy = timed(writeStore,os.path.join(tmp,'store'))
+    storeRead, new    = timed(readStore,os.path.join(tmp,'store'),*hour)
+    bulkWrite, dummy  = timed(extendStore,os.path.join(tmp,'bulk'))
+    bulkRead, bulk    = timed(readStore,os.path.join(tmp,'bulk'),*hour)
+    assert list(old) == list(new) == list(bulk)
+
+    print "%d rows, query of one hour (%d rows)" % (ROWS,len(new))
+    print "%-12s %10s %10s" % ('','write','query')
+    print "%-12s %9.3fs %9.4fs" % ('CSV',csvWrite,csvRead)
+    print "%-12s %9.3fs %9.4fs" % ('PowerStore',storeWrite,storeRead)
+    print "%-12s %9.3fs %9.4fs" % ('  (extend)',bulkWrite,bulkRead)
+  finally:
+    shutil.rmtree(tmp)
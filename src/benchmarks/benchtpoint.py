@@ -0,0 +1,99 @@
+#!/usr/bin/python
+
+# Benchmark: the original mutable TPoint compared to the immutable, interned
+# TPoint in schedule-heavy code (number of live objects, memory and
+# operations per second).
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+import os, sys
+import gc
+import random
+import timeit
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__), ".."))
+from ediplug import *
+from legacytpoint import MutableTPoint
+
+POINTS = 50000
+
+random.seed(42)
+INDICES = [random.randrange(10080) for i in range(POINTS)]
+
+# number of live instances of a class   -------------------------------------
+
+def instances(cls):
+  gc.collect()
+  return len([o for o in gc.get_objects() if type(o) is cls])
+
+# size of a single instance   -----------------------------------------------
+
+def size(tp):
+  if hasattr(tp,'__dict__'):
+    return sys.getsizeof(tp) + sys.getsizeof(tp.__dict__)
+  return sys.getsizeof(tp)
+
+# workloads   ----------------------------------------------------------------
+
+def create(cls):
+  return [cls.create(i) for i in INDICES]
+
+def construct(cls):
+  return [cls(i // 1440,(i % 1440) // 60,i % 60) for i in INDICES]
+
+def after(cls):
+  tp = cls.create(0)
+  return [tp.createAfter(0,0,i) for i in INDICES]
+
+def unique(points):
+  if isinstance(points[0],TPoint):
+    return len(set(points))
+  return len(set([tp.getIndex() for tp in points]))
+
+def ordered(points):
+  return sorted(points,key=type(points[0]).getIndex)
+
+def compared(points):
+  if isinstance(points[0],TPoint):
+    return sorted(points)
+  return sorted(points,key=type(points[0]).getIndex)
+
+def transport(points):
+  return [tp.toTransport() for tp in points]
+
+def best(fn,*args):
+  timer = timeit.default_timer
+  result = None
+  for i in range(3):
+    start = timer()
+    fn(*args)
+    duration = timer()-start
+    result = duration if result is None else min(result,duration)
+  return POINTS/result
+
+if __name__ == "__main__":
+  assert [tp.getIndex() for tp in create(TPoint)] == \
+         [tp.getIndex() for tp in create(MutableTPoint)]
+  assert unique(create(TPoint)) == unique(create(MutableTPoint))
+
+  oldPoints, newPoints = create(MutableTPoint), create(TPoint)
+  print "%d timepoints" % POINTS
+  print
+  print "%-16s %12s %12s" % ('','mutable','TPoint')
+  print "%-16s %12d %12d" % ('objects',instances(MutableTPoint),
+                                       instances(TPoint))
+  print "%-16s %12d %12d" % ('bytes/object',size(oldPoints[0]),
+                                            size(newPoints[0]))
+  for name, fn in [('create',create),('constructor',construct),
+                   ('createAfter',after)]:
+    old, new = best(fn,MutableTPoint), best(fn,TPoint)
+    print "%-16s %10.0f/s %10.0f/s  %6.1fx" % (name,old,new,new/old)
+  for name, fn in [('unique',unique),('sort (key)',ordered),
+                   ('sort (<)',compared),
+                   ('toTransport',transport)]:
+    old, new = best(fn,oldPoints), best(fn,newPoints)
+    print "%-16s %10.0f/s %10.0f/s  %6.1fx" % (name,old,new,new/old)
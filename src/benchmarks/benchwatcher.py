@@ -0,0 +1,117 @@
+#!/usr/bin/python
+
+# Benchmark: detecting state changes of plugs by polling all plugs at a
+# fixed interval (and diffing by hand) compared to the Watcher (adaptive
+# interval, spread polls). A few plugs are switched repeatedly, all other
+# plugs are idle. Reports requests, the largest burst of requests and the
+# delay from a switch to its detection.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+import os, sys
+import time
+import random
+import threading
+
+sys.path.insert(0,os.path.join(os.path.dirname(__file__), ".."))
+from ediplug import *
+
+PLUGS    = 40
+ACTIVE   = 4                            # plugs which are switched
+DURATION = 10.0
+INTERVAL = 1.0                          # interval of the fixed poller
+WINDOW   = 0.1                          # window for counting bursts
+
+def burst(stamps):
+  stamps = sorted(stamps)
+  best   = 0
+  first  = 0
+  for last in range(len(stamps)):
+    while stamps[last] - stamps[first] > WINDOW:
+      first += 1
+    best = max(best,last - first + 1)
+  return best
+
+def switcher(sim,plugs,switched,stop):
+  # switch the active plugs (directly at the simulator, not counted)
+  rnd   = random.Random(7)
+  names = sorted(plugs.keys())[:ACTIVE]
+  while not stop.is_set():
+    name  = rnd.choice(names)
+    state = not sim.getState(name)['state']
+    sim.setPowerState(name,state)
+    switched.append((name,state,time.time()))
+    stop.wait(rnd.uniform(1.0,2.0))
+
+def detect(switched,detected):
+  delays = []
+  for (name,state,when) in switched:
+    later = [t for (n,s,t) in detected if n == name and s == state and
+                                                                 t >= when]
+    if later:
+      delays.append(min(later) - when)
+  return delays
+
+def runFixed(sim,plugs):
+  fleet    = Fleet(plugs,workers=16)
+  known    = {}
+  detected = []
+  switched = []
+  stop     = threading.Event()
+  thread   = threading.Thread(target=switcher,args=(sim,plugs,switched,stop))
+  start    = time.time()
+  thread.start()
+  tick     = 0
+  while time.time() - start < DURATION:
+    for name, result in fleet.getPowerState().items():
+      if result['ok'] and known.get(name,result['value']) <> result['value']:
+        detected.append((name,result['value'],time.time()))
+      if result['ok']:
+        known[name] = result['value']
+    tick += 1
+    time.sleep(max(0,start + tick*INTERVAL - time.time()))
+  stop.set()
+  thread.join()
+  fleet.shutdown()
+  return switched, detected
+
+def runWatcher(sim,plugs):
+  watcher  = Watcher(plugs,minInterval=0.25,maxInterval=2.0,workers=16,
+                     seed=1)
+  detected = []
+  watcher.addCallback(lambda e: e['kind'] == 'state' and
+                      detected.append((e['plug'],e['new'],e['time'])))
+  switched = []
+  stop     = threading.Event()
+  thread   = threading.Thread(target=switcher,args=(sim,plugs,switched,stop))
+  watcher.start()
+  time.sleep(2.0)                       # initial state of all plugs
+  thread.start()
+  time.sleep(DURATION)
+  stop.set()
+  thread.join()
+  watcher.shutdown()
+  return switched, detected
+
+if __name__ == "__main__":
+  sim     = Simulator(PLUGS).start()
+  plugs   = sim.getPlugs(session=PlugSession(poolConnections=PLUGS))
+  metrics = Metrics()
+  stamps  = []
+  metrics.addCallback(lambda event: stamps.append(time.time()))
+  for plug in plugs.values():
+    plug.setMetrics(metrics)
+
+  for label, run in [('fixed interval',runFixed),('Watcher',runWatcher)]:
+    del stamps[:]
+    switched, detected = run(sim,plugs)
+    delays = detect(switched,detected)
+    print "%-15s %5d requests, burst %3d req/%.1fs, detected %2d/%2d, " \
+          "delay mean %4.0f ms, max %5.0f ms" % (label,len(stamps),
+           burst(stamps),WINDOW,len(delays),len(switched),
+           1000*sum(delays)/max(1,len(delays)),1000*max(delays or [0]))
+  sim.stop()
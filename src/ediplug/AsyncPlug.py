@@ -0,0 +1,126 @@
+#!/usr/bin/python
+
+# Class definition of AsyncPlug
+#
+# AsyncPlug wraps a Plug and executes its commands on an Executor. All
+# commands return a Future immediately. The number of commands in flight
+# for a single plug is limited, further commands are queued per plug
+# without occupying a worker thread.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+import threading
+import collections
+
+from Executor import Future as Future
+
+class AsyncPlug(object):
+  """Non-blocking interface to a Plug"""
+
+  # initialize AsyncPlug object   --------------------------------------------
+
+  def __init__(self,plug,executor,maxInFlight=1):
+    self.__plug        = plug
+    self.__executor    = executor
+    self.__maxInFlight = maxInFlight
+    self.__inFlight    = 0
+    self.__pending     = collections.deque()
+    self.__lock        = threading.Lock()
+
+  # technical representation of plug   ----------------------------------------
+
+  def __repr__(self):
+    return "<AsyncPlug: %r>" % self.__plug
+
+  # return wrapped plug   -----------------------------------------------------
+
+  def getPlug(self):
+    return self.__plug
+
+  # submit a method of the wrapped plug   -------------------------------------
+
+  def _submit(self,method,*args):
+    future = Future()
+    with self.__lock:
+      if self.__inFlight < self.__maxInFlight:
+        self.__inFlight += 1
+      else:
+        self.__pending.append((future,method,args))
+        return future
+    self.__start(future,method,args)
+    return future
+
+  # start execution and pass result to future   ------------------------------
+
+  def __start(self,future,method,args):
+    running = self.__executor.submit(method,*args)
+    running.addCallback(lambda f: self.__done(f,future))
+
+  # copy result and start next pending command   -----------------------------
+
+  def __done(self,running,future):
+    with self.__lock:
+      if self.__pending:
+        next = self.__pending.popleft()
+      else:
+        next = None
+        self.__inFlight -= 1
+    if next is not None:
+      self.__start(*next)
+    future._copy(running)
+
+  # query system-info   ------------------------------------------------------
+
+  def getSysInfo(self):
+    return self._submit(self.__plug.getSysInfo)
+
+  # query name and type of plug   --------------------------------------------
+
+  def getNameAndType(self):
+    return self._submit(self.__plug.getNameAndType)
+
+  # query power-state   ------------------------------------------------------
+
+  def getPowerState(self):
+    return self._submit(self.__plug.getPowerState)
+
+  # set power-state   ---------------------------------------------------------
+
+  def setPowerState(self,active=True):
+    return self._submit(self.__plug.setPowerState,active)
+
+  # query schedule   ----------------------------------------------------------
+
+  def getSchedule(self,schedule=None,refresh=False):
+    return self._submit(self.__plug.getSchedule,schedule,False,refresh)
+
+  # set schedule (for a given day)   ------------------------------------------
+
+  def setSchedule(self,schedule,day=None,force=False):
+    return self._submit(self.__plug.setSchedule,schedule,day,force)
+
+  # set schedule, only sending the days which differ from the plug   -------
+
+  def syncSchedule(self,schedule,refresh=False):
+    return self._submit(self.__plug.syncSchedule,schedule,refresh)
+
+  # set state for a given time-range   ----------------------------------------
+
+  def setState(self,start,end,active=True):
+    return self._submit(self.__plug.setState,start,end,active)
+
+  # configure (exclusive) time in status ON/OFF   -----------------------------
+
+  def setExclusiveState(self,start,end,active=True):
+    return self._submit(self.__plug.setExclusiveState,start,end,active)
+
+  # clear schedule   ----------------------------------------------------------
+
+  def clear(self,active=True):
+    return self._submit(self.__plug.clear,active)
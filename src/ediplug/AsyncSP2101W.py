@@ -0,0 +1,29 @@
+#!/usr/bin/python
+
+# Class definition of AsyncSP2101W
+#
+# This class implements the non-blocking interface for the Edimax SP2101W
+# plug.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+from AsyncPlug import AsyncPlug as AsyncPlug
+
+class AsyncSP2101W(AsyncPlug):
+  """Non-blocking interface to the Edimax SP2101W Plug"""
+
+  # initialize AsyncSP2101W object   -----------------------------------------
+
+  def __init__(self,plug,executor,maxInFlight=1):
+    super(AsyncSP2101W,self).__init__(plug,executor,maxInFlight)
+
+  # query power-info   ------------------------------------------------------
+
+  def getPowerInfo(self):
+    return self._submit(self.getPlug().getPowerInfo)
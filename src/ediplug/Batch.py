@@ -0,0 +1,84 @@
+#!/usr/bin/python
+
+# Class definition of Batch
+#
+# Batch collects queries for a single plug and executes them with as few
+# requests as possible. The plug protocol allows multiple children below the
+# CMD element, so all queries are merged into a single document and all
+# results are parsed from the same response.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+import time
+
+from Codec import Codec as Codec
+
+class Batch(object):
+  """Batch of queries for a plug"""
+
+  # initialize Batch object   ------------------------------------------------
+
+  def __init__(self,plug,merge=True):
+    self.__plug  = plug
+    self.__merge = merge
+    self.__items = []
+
+  # add a query   -------------------------------------------------------------
+
+  def _add(self,key,query,parse):
+    self.__items.append((key,query,parse))
+    return self
+
+  # query system-info   ------------------------------------------------------
+
+  def sysInfo(self):
+    return self._add('sysInfo',Codec.element("SYSTEM_INFO"),
+                     self.__plug._parseSysInfo)
+
+  # query power-state   ------------------------------------------------------
+
+  def powerState(self):
+    return self._add('powerState',Codec.element("Device.System.Power.State"),
+                     self.__plug._parsePowerState)
+
+  # query power-info (SP2101W only)   ----------------------------------------
+
+  def powerInfo(self):
+    return self._add('powerInfo',Codec.element("NOW_POWER"),
+                     self.__plug._parsePowerInfo)
+
+  # query schedule   ----------------------------------------------------------
+
+  def schedule(self):
+    return self._add('schedule',self.__plug._getScheduleQuery(),
+                     self.__plug._parseSchedule)
+
+  # execute all queries and return a map of results   ------------------------
+  # (keys are the names of the query methods, e.g. 'powerState')
+
+  def execute(self):
+    results = {}
+    if not self.__items:
+      return results
+
+    if self.__merge:
+      groups = [self.__items]
+    else:
+      groups = [[item] for item in self.__items]
+
+    for group in groups:
+      start   = time.time()
+      body    = ''.join([query for (key,query,parse) in group])
+      doc     = self.__plug._getXML('get',body)
+      build   = time.time() - start
+      command = 'get:' + '+'.join([key for (key,query,parse) in group])
+      root    = self.__plug._postCmd(doc,build,command)
+      for (key,query,parse) in group:
+        results[key] = parse(root)
+    return results
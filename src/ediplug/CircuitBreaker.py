@@ -0,0 +1,92 @@
+#!/usr/bin/python
+
+# Class definition of CircuitBreaker
+#
+# CircuitBreaker stops sending requests to a plug after a number of
+# consecutive failures. While the breaker is open, requests fail fast. After
+# a cooldown a single trial request is let through (half-open): if it
+# succeeds, the breaker closes again, otherwise it stays open for another
+# cooldown.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+import time
+import threading
+
+class CircuitBreaker(object):
+  """Fast-fail requests to plugs which are known to be down"""
+
+  CLOSED    = 'closed'
+  OPEN      = 'open'
+  HALF_OPEN = 'half-open'
+
+  # initialize CircuitBreaker object   ---------------------------------------
+
+  def __init__(self,threshold=3,cooldown=30.0):
+    self.__threshold = threshold        # consecutive failures until open
+    self.__cooldown  = cooldown         # seconds until the next trial
+    self.__failures  = 0
+    self.__openedAt  = None
+    self.__trial     = None             # start of trial request in flight
+    self.__lock      = threading.Lock()
+
+  # technical representation of breaker   -------------------------------------
+
+  def __repr__(self):
+    return "<CircuitBreaker: %s, failures: %d>" % (self.getState(),
+                                                   self.__failures)
+
+  # return state of the breaker   ---------------------------------------------
+
+  def getState(self):
+    with self.__lock:
+      if self.__openedAt is None:
+        return CircuitBreaker.CLOSED
+      if self.__trial is not None or \
+                   time.time() - self.__openedAt >= self.__cooldown:
+        return CircuitBreaker.HALF_OPEN
+      return CircuitBreaker.OPEN
+
+  # check if a request may be sent   ------------------------------------------
+  # (after the cooldown, only a single trial request is allowed. A trial
+  # which was neither recorded as success nor as failure expires after
+  # another cooldown)
+
+  def allow(self):
+    with self.__lock:
+      if self.__openedAt is None:
+        return True
+      now = time.time()
+      if now - self.__openedAt < self.__cooldown or \
+         (self.__trial is not None and now - self.__trial < self.__cooldown):
+        return False
+      self.__trial = now
+      return True
+
+  # record a successful request   ---------------------------------------------
+
+  def success(self):
+    with self.__lock:
+      self.__failures = 0
+      self.__openedAt = None
+      self.__trial    = None
+
+  # record a failed request   -------------------------------------------------
+
+  def failure(self):
+    with self.__lock:
+      self.__failures += 1
+      if self.__trial is not None or self.__failures >= self.__threshold:
+        self.__openedAt = time.time()
+      self.__trial = None
+
+  # close the breaker   -------------------------------------------------------
+
+  def reset(self):
+    self.success()
@@ -0,0 +1,120 @@
+#!/usr/bin/python
+
+# Class definition of Codec
+#
+# Codec builds the XML command documents sent to the plugs and parses the
+# responses. Requests are assembled from prebuilt string templates, responses
+# are parsed with (c)ElementTree instead of building a minidom tree.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+import re
+try:
+  import xml.etree.cElementTree as ET
+except ImportError:
+  import xml.etree.ElementTree as ET
+
+from PlugError import PlugResponseError
+
+class Codec(object):
+  """Encoding and decoding of plug commands"""
+
+  # templates of the command document   --------------------------------------
+
+  HEADER = '<?xml version="1.0" ?><SMARTPLUG id="edimax"><CMD id="%s">'
+  FOOTER = '</CMD></SMARTPLUG>'
+
+  # cache of complete documents for queries of a single tag   ----------------
+
+  _queries = {}
+
+  # command-type and first tag of a command document   -----------------------
+
+  COMMAND_RE = re.compile(r'<CMD id="([^"]*)">\s*<([^\s/>]+)')
+
+  # escape text and attribute values   ---------------------------------------
+  # (same results as xml.sax.saxutils.escape/quoteattr, without importing
+  # the (slow loading) xml.sax package)
+
+  @staticmethod
+  def escape(value):
+    return value.replace('&','&amp;').replace('<','&lt;').replace('>','&gt;')
+
+  @staticmethod
+  def quoteattr(value):
+    value = Codec.escape(value).replace('\n','&#10;').replace(
+                                   '\r','&#13;').replace('\t','&#9;')
+    if '"' not in value:
+      return '"%s"' % value
+    if "'" not in value:
+      return "'%s'" % value
+    return '"%s"' % value.replace('"','&quot;')
+
+  # return XML-element as string   -------------------------------------------
+
+  @staticmethod
+  def element(tag,value=None,attrs=None):
+    if attrs:
+      attrs = ''.join([' %s=%s' % (name,Codec.quoteattr(attrs[name]))
+                                                  for name in sorted(attrs)])
+    else:
+      attrs = ''
+    if value is None:
+      return '<%s%s/>' % (tag,attrs)
+    return '<%s%s>%s</%s>' % (tag,attrs,Codec.escape(value),tag)
+
+  # return command document for the given body   -----------------------------
+
+  @staticmethod
+  def document(cmdType,body=''):
+    return (Codec.HEADER % cmdType) + body + Codec.FOOTER
+
+  # return (cached) command document querying a single tag   ----------------
+
+  @staticmethod
+  def query(tag):
+    doc = Codec._queries.get(tag)
+    if doc is None:
+      doc = Codec.document('get',Codec.element(tag))
+      Codec._queries[tag] = doc
+    return doc
+
+  # return name of the command of a document (e.g. "get:NOW_POWER")   -------
+
+  @staticmethod
+  def command(doc):
+    match = Codec.COMMAND_RE.search(doc)
+    if match is None:
+      return 'unknown'
+    return '%s:%s' % match.groups()
+
+  # parse response and return root element   --------------------------------
+  # (the plugs declare the unknown encoding "UTF8", so it is overridden)
+
+  @staticmethod
+  def parse(content):
+    if isinstance(content,unicode):
+      content = content.encode('utf-8')
+    parser = ET.XMLParser(encoding='utf-8')
+    parser.feed(content)
+    return parser.close()
+
+  # return first element with the given tag   --------------------------------
+
+  @staticmethod
+  def find(root,tag):
+    for elem in root.iter(tag):
+      return elem
+    raise PlugResponseError("tag %s not found in response" % tag)
+
+  # return text of first element with the given tag   ------------------------
+
+  @staticmethod
+  def findText(root,tag):
+    return Codec.find(root,tag).text
@@ -0,0 +1,90 @@
+#!/usr/bin/python
+
+# Class definition of DiscoveryCache
+#
+# DiscoveryCache persists the results of PlugFinder (name, ip, port, model
+# and the time the plug was last seen) in a JSON-file. PlugFinder tries the
+# cached addresses first and only scans the network for plugs not found
+# at their cached address.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+import os
+import time
+import json
+
+class DiscoveryCache(object):
+  """Persistent cache of discovered plugs"""
+
+  # default location of cache-file   -----------------------------------------
+
+  DEFAULT_PATH = os.path.join('~','.cache','ediplug','plugs.json')
+
+  # initialize DiscoveryCache object   ---------------------------------------
+
+  def __init__(self,path=None):
+    if path is None:
+      path = DiscoveryCache.DEFAULT_PATH
+    self.__path    = os.path.expanduser(path)
+    self.__entries = None
+    self.__changed = False
+
+  # technical representation of cache   ---------------------------------------
+
+  def __repr__(self):
+    return "<DiscoveryCache: %s>" % self.__path
+
+  # read entries from file (on first access)   --------------------------------
+
+  def __load(self):
+    if self.__entries is not None:
+      return self.__entries
+    try:
+      with open(self.__path) as f:
+        self.__entries = json.load(f)
+    except (IOError,ValueError):
+      self.__entries = {}
+    return self.__entries
+
+  # return entry for the given plugname (or None)   ---------------------------
+
+  def get(self,name):
+    return self.__load().get(name)
+
+  # return all entries as map, keyed by plugname   ----------------------------
+
+  def entries(self):
+    return dict(self.__load())
+
+  # add or update an entry   --------------------------------------------------
+
+  def update(self,name,ip,port,model):
+    self.__load()[name] = {'ip': ip, 'port': port, 'model': model,
+                           'lastSeen': time.time()}
+    self.__changed = True
+
+  # remove an entry   ---------------------------------------------------------
+
+  def remove(self,name):
+    if self.__load().pop(name,None) is not None:
+      self.__changed = True
+
+  # write entries to file (if changed)   --------------------------------------
+
+  def save(self):
+    if not self.__changed:
+      return
+    dirname = os.path.dirname(self.__path)
+    if dirname and not os.path.isdir(dirname):
+      os.makedirs(dirname)
+    tmpPath = self.__path + '.tmp'
+    with open(tmpPath,'w') as f:
+      json.dump(self.__entries,f,indent=2,sort_keys=True)
+    os.rename(tmpPath,self.__path)
+    self.__changed = False
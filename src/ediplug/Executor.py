@@ -0,0 +1,158 @@
+#!/usr/bin/python
+
+# Class definition of Executor and Future
+#
+# Executor is a small, bounded pool of worker threads. Submitted functions
+# return a Future which holds the result (or exception) once the function
+# has finished.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+import sys
+import traceback
+import threading
+import Queue
+
+class Future(object):
+  """Result of an asynchronous function call"""
+
+  # initialize Future object   -----------------------------------------------
+
+  def __init__(self):
+    self.__lock      = threading.Lock()
+    self.__event     = threading.Event()
+    self.__result    = None
+    self.__error     = None
+    self.__callbacks = []
+
+  # check if the call has finished   -----------------------------------------
+
+  def done(self):
+    return self.__event.is_set()
+
+  # wait for and return result (exceptions of the call are re-raised)   -----
+
+  def result(self,timeout=None):
+    if not self.__event.wait(timeout):
+      raise RuntimeError("timeout waiting for result")
+    if self.__error is not None:
+      raise self.__error[0], self.__error[1], self.__error[2]
+    return self.__result
+
+  # wait for and return exception of call (or None)   ------------------------
+
+  def exception(self,timeout=None):
+    if not self.__event.wait(timeout):
+      raise RuntimeError("timeout waiting for result")
+    return self.__error[1] if self.__error is not None else None
+
+  # add callback, called with the future as argument when done   -----------
+
+  def addCallback(self,callback):
+    with self.__lock:
+      if not self.__event.is_set():
+        self.__callbacks.append(callback)
+        return
+    callback(self)
+
+  # set result (called by the executor)   ------------------------------------
+
+  def _setResult(self,result):
+    self.__result = result
+    self._finish()
+
+  # set exception (called by the executor)   ---------------------------------
+
+  def _setError(self,excInfo):
+    self.__error = excInfo
+    self._finish()
+
+  # copy result or exception of another (finished) future   ----------------
+
+  def _copy(self,other):
+    self.__result = other.__result
+    self.__error  = other.__error
+    self._finish()
+
+  # mark future as finished and run callbacks   ------------------------------
+  # (exceptions of callbacks are printed to stderr, they must not kill the
+  # worker thread)
+
+  def _finish(self):
+    with self.__lock:
+      self.__event.set()
+      callbacks, self.__callbacks = self.__callbacks, []
+    for callback in callbacks:
+      try:
+        callback(self)
+      except Exception:
+        traceback.print_exc()
+
+class Executor(object):
+  """Pool of worker threads"""
+
+  # initialize Executor object   ---------------------------------------------
+
+  def __init__(self,workers=16):
+    self.__queue   = Queue.Queue()
+    self.__threads = []
+    for i in range(workers):
+      thread = threading.Thread(target=self.__work)
+      thread.daemon = True
+      thread.start()
+      self.__threads.append(thread)
+
+  # worker loop   ------------------------------------------------------------
+
+  def __work(self):
+    while True:
+      item = self.__queue.get()
+      if item is None:
+        return
+      future, fn, args, kwargs = item
+      try:
+        result = fn(*args,**kwargs)
+      except:
+        future._setError(sys.exc_info())
+      else:
+        future._setResult(result)
+
+  # submit a function for execution   ----------------------------------------
+
+  def submit(self,fn,*args,**kwargs):
+    future = Future()
+    self.__queue.put((future,fn,args,kwargs))
+    return future
+
+  # stop all workers (pending functions are executed first)   ---------------
+
+  def shutdown(self,wait=True):
+    for thread in self.__threads:
+      self.__queue.put(None)
+    if wait:
+      for thread in self.__threads:
+        thread.join()
+
+  # yield futures in the order they finish   ---------------------------------
+
+  @staticmethod
+  def asCompleted(futures):
+    queue = Queue.Queue()
+    count = 0
+    for future in futures:
+      future.addCallback(queue.put)
+      count += 1
+    for i in range(count):
+      yield queue.get()
+
+  # wait for all futures and return their results   -------------------------
+
+  @staticmethod
+  def gather(futures):
+    return [future.result() for future in futures]
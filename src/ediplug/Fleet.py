@@ -0,0 +1,145 @@
+#!/usr/bin/python
+
+# Class definition of Fleet
+#
+# Fleet applies the same command to many plugs concurrently. Commands run
+# on a bounded Executor, failed commands are retried and plugs not answering
+# within the timeout are reported as failed. Every command returns a map
+# name -> result. A schedule sent to many plugs is serialized only once.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+import time
+import Queue
+
+from Executor import Executor as Executor
+from Schedule import Schedule as Schedule
+from Plug import Plug as Plug
+
+class Fleet(object):
+  """Execute commands on many plugs concurrently"""
+
+  # initialize Fleet object   ------------------------------------------------
+  # (plugs is a map name -> plug, e.g. the result of PlugFinder.search)
+
+  def __init__(self,plugs,workers=16,timeout=None,retries=0,backoff=0.5,
+               executor=None):
+    self.__plugs    = dict(plugs)
+    self.__timeout  = timeout           # per plug, None: wait forever
+    self.__retries  = retries
+    self.__backoff  = backoff
+    if executor is None:
+      executor = Executor(max(1,min(workers,len(self.__plugs))))
+    self.__executor = executor
+
+  # technical representation of fleet   ---------------------------------------
+
+  def __repr__(self):
+    return "<Fleet: %s>" % sorted(self.__plugs.keys())
+
+  # return map of plugs   -----------------------------------------------------
+
+  def getPlugs(self):
+    return dict(self.__plugs)
+
+  # execute a command on a single plug (executed by a worker)   --------------
+  # (a command failing with an exception is retried, with check also a
+  # command returning False)
+
+  def __run(self,name,fn,check,queue,started):
+    started[name] = time.time()
+    result = {'ok': False, 'value': None, 'error': None, 'attempts': 0,
+              'elapsed': 0.0}
+    for attempt in range(self.__retries+1):
+      if attempt:
+        time.sleep(self.__backoff*2**(attempt-1))
+      result['attempts'] += 1
+      try:
+        result['value'] = fn(self.__plugs[name])
+        result['error'] = None
+      except Exception as e:
+        result['error'] = e
+        continue
+      if not check or result['value'] is not False:
+        result['ok'] = True
+        break
+    result['elapsed'] = time.time() - started[name]
+    queue.put((name,result))
+
+  # execute a command on all plugs and collect the results   -----------------
+  # (fn is called with the plug as argument, with check a result of False
+  # counts as failure, e.g. for commands returning the success of a setup)
+
+  def execute(self,fn,check=False):
+    queue   = Queue.Queue()
+    started = {}
+    for name in self.__plugs:
+      self.__executor.submit(self.__run,name,fn,check,queue,started)
+
+    results = {}
+    while len(results) < len(self.__plugs):
+      # wait for the next result, but not beyond the next deadline of a
+      # running plug (the wait is interruptible, unlike a plain get())
+      wait = self.__timeout if self.__timeout is not None else 60
+      if self.__timeout is not None:
+        running = [started[name] for name in started.keys()
+                                                       if name not in results]
+        if running:
+          wait = max(0,min(running) + self.__timeout - time.time())
+      try:
+        name, result = queue.get(True,wait)
+        if name not in results:
+          results[name] = result
+      except Queue.Empty:
+        if self.__timeout is None:
+          continue
+        # report overdue plugs, their late results are ignored
+        now = time.time()
+        for name in started.keys():
+          if name not in results and now - started[name] >= self.__timeout:
+            results[name] = {'ok': False, 'value': None,
+                             'error': RuntimeError("timeout"),
+                             'attempts': None, 'elapsed': now - started[name]}
+    return results
+
+  # query power-state of all plugs   ------------------------------------------
+
+  def getPowerState(self):
+    return self.execute(lambda plug: plug.getPowerState())
+
+  # set power-state of all plugs   --------------------------------------------
+
+  def setPowerState(self,active):
+    return self.execute(lambda plug: plug.setPowerState(active),True)
+
+  # send schedule to all plugs   ----------------------------------------------
+  # (all days are sent, the command-document is only created once)
+
+  def setSchedule(self,schedule):
+    days = range(7)
+    doc  = Plug._getScheduleDoc(schedule,days)
+    return self.execute(lambda plug: plug._postSchedule(doc,schedule,days),
+                        True)
+
+  # configure (exclusive) time in status ON/OFF for all plugs   --------------
+
+  def setExclusiveState(self,start,end,active=True):
+    sched = Schedule(not active)
+    sched.setState(start,end,active)
+    return self.setSchedule(sched)
+
+  # clear schedule of all plugs   ---------------------------------------------
+
+  def clear(self,active=True):
+    return self.setSchedule(Schedule(active))
+
+  # shutdown executor   -------------------------------------------------------
+
+  def shutdown(self,wait=True):
+    self.__executor.shutdown(wait)
@@ -0,0 +1,57 @@
+#!/usr/bin/python
+
+# Class definition of LazyModule
+#
+# LazyModule is a stand-in for a module which is imported on first access
+# to one of its attributes. Modules only needed by some commands (requests,
+# the discovery dependencies netifaces and netaddr) are bound to a
+# LazyModule, so "import ediplug" stays cheap for short-running scripts.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+import sys
+import threading
+
+class LazyModule(object):
+  """Module imported on first use"""
+
+  __lock = threading.Lock()
+
+  # initialize LazyModule object   -------------------------------------------
+
+  def __init__(self,name):
+    self.__name   = name
+    self.__module = None
+
+  # technical representation of lazy module   ---------------------------------
+
+  def __repr__(self):
+    return "<LazyModule: %s, %s>" % (self.__name,
+                              'loaded' if self.isLoaded() else 'not loaded')
+
+  # return the module (it is imported on the first call)   ------------------
+
+  def load(self):
+    if self.__module is None:
+      with LazyModule.__lock:
+        if self.__module is None:
+          __import__(self.__name)
+          self.__module = sys.modules[self.__name]
+    return self.__module
+
+  # check if the module is imported (by this or any other LazyModule)   ----
+
+  def isLoaded(self):
+    return self.__module is not None or self.__name in sys.modules
+
+  # return attribute of the module   ------------------------------------------
+  # (only called for names which are not attributes of the LazyModule)
+
+  def __getattr__(self,name):
+    return getattr(self.load(),name)
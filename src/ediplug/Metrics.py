@@ -0,0 +1,195 @@
+#!/usr/bin/python
+
+# Class definition of Metrics
+#
+# Metrics collects statistics about the requests of plugs: latency
+# histograms for building the request, the network round-trip and parsing
+# the response, bytes sent and received, status codes and errors. All
+# values are kept per plug and command (e.g. "get:NOW_POWER"). Plugs only
+# record metrics if a Metrics object is set, so there is (almost) no
+# overhead otherwise.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+import bisect
+import threading
+
+class Metrics(object):
+  """Statistics of plug requests"""
+
+  # upper bounds of the histogram buckets (in seconds)   ---------------------
+
+  BUCKETS = [0.0001,0.00025,0.0005,0.001,0.0025,0.005,0.01,0.025,0.05,
+             0.1,0.25,0.5,1.0,2.5,5.0,10.0]
+
+  PHASES  = ['build','network','parse']
+
+  # initialize Metrics object   ----------------------------------------------
+
+  def __init__(self,buckets=None):
+    self.__buckets   = sorted(buckets) if buckets is not None else \
+                                                              Metrics.BUCKETS
+    self.__data      = {}               # (plug,command) -> values
+    self.__callbacks = []
+    self.__callbackErrors = 0
+    self.__lock      = threading.Lock()
+
+  # technical representation of metrics   -------------------------------------
+
+  def __repr__(self):
+    return "<Metrics: %d series>" % len(self.__data)
+
+  # add callback, called with a map describing every request   --------------
+  # (exceptions of callbacks are counted, they never fail the request)
+
+  def addCallback(self,callback):
+    self.__callbacks.append(callback)
+
+  # return number of failed callback calls   ----------------------------------
+
+  def getCallbackErrors(self):
+    with self.__lock:
+      return self.__callbackErrors
+
+  # return (new) values of a plug and command   -------------------------------
+
+  def __values(self,plug,command):
+    key = (plug,command)
+    values = self.__data.get(key)
+    if values is None:
+      values = {'sent': 0, 'received': 0, 'status': {}, 'errors': {}}
+      for phase in Metrics.PHASES:
+        values[phase] = {'buckets': [0]*(len(self.__buckets)+1),
+                         'sum': 0.0, 'count': 0}
+      self.__data[key] = values
+    return values
+
+  # record a request   --------------------------------------------------------
+  # (durations in seconds, a phase with duration None is not recorded,
+  # status is the HTTP status or None, error the exception or None)
+
+  def record(self,plug,command,build=None,network=None,parse=None,sent=0,
+             received=0,status=None,error=None):
+    durations = {'build': build, 'network': network, 'parse': parse}
+    with self.__lock:
+      values = self.__values(plug,command)
+      for phase in Metrics.PHASES:
+        duration = durations[phase]
+        if duration is None:
+          continue
+        histogram = values[phase]
+        histogram['buckets'][bisect.bisect_left(self.__buckets,duration)] += 1
+        histogram['sum']   += duration
+        histogram['count'] += 1
+      values['sent']     += sent
+      values['received'] += received
+      if status is not None:
+        values['status'][status] = values['status'].get(status,0) + 1
+      if error is not None:
+        name = type(error).__name__
+        values['errors'][name] = values['errors'].get(name,0) + 1
+
+    if self.__callbacks:
+      event = {'plug': plug, 'command': command, 'sent': sent,
+               'received': received, 'status': status, 'error': error}
+      event.update(durations)
+      for callback in self.__callbacks:
+        try:
+          callback(event)
+        except Exception:
+          with self.__lock:
+            self.__callbackErrors += 1
+
+  # return a copy of all values   ---------------------------------------------
+  # (map (plug,command) -> values, histogram buckets are not cumulative,
+  # the last bucket counts durations above the largest bound)
+
+  def snapshot(self):
+    with self.__lock:
+      result = {}
+      for key, values in self.__data.items():
+        copy = {'sent': values['sent'], 'received': values['received'],
+                'status': dict(values['status']),
+                'errors': dict(values['errors'])}
+        for phase in Metrics.PHASES:
+          copy[phase] = {'buckets': list(values[phase]['buckets']),
+                         'sum': values[phase]['sum'],
+                         'count': values[phase]['count']}
+        result[key] = copy
+    return result
+
+  # return buckets upper bounds   ---------------------------------------------
+
+  def getBuckets(self):
+    return list(self.__buckets)
+
+  # reset all values   --------------------------------------------------------
+
+  def reset(self):
+    with self.__lock:
+      self.__data = {}
+      self.__callbackErrors = 0
+
+  # export all values in the Prometheus text format   -----------------------
+
+  def toPrometheus(self,prefix='ediplug'):
+    data  = self.snapshot()
+    keys  = sorted(data.keys())
+    lines = []
+
+    def labels(plug,command,*extra):
+      pairs = [('plug',plug),('command',command)] + list(extra)
+      return '{%s}' % ','.join(['%s="%s"' % (name,
+               str(value).replace('\\','\\\\').replace('"','\\"'))
+                                                     for name, value in pairs])
+
+    name = prefix + '_request_seconds'
+    lines.append('# HELP %s Duration of the phases of plug requests.' % name)
+    lines.append('# TYPE %s histogram' % name)
+    for plug, command in keys:
+      for phase in Metrics.PHASES:
+        histogram = data[(plug,command)][phase]
+        if not histogram['count']:
+          continue
+        total = 0
+        for bound, count in zip(self.__buckets + ['+Inf'],
+                                histogram['buckets']):
+          total += count
+          lines.append('%s_bucket%s %d' % (name,labels(plug,command,
+                                    ('phase',phase),('le',bound)),total))
+        lines.append('%s_sum%s %r' % (name,labels(plug,command,
+                                       ('phase',phase)),histogram['sum']))
+        lines.append('%s_count%s %d' % (name,labels(plug,command,
+                                       ('phase',phase)),histogram['count']))
+
+    for key, help in [('sent','Bytes sent to plugs.'),
+                      ('received','Bytes received from plugs.')]:
+      name = '%s_bytes_%s_total' % (prefix,key)
+      lines.append('# HELP %s %s' % (name,help))
+      lines.append('# TYPE %s counter' % name)
+      for plug, command in keys:
+        lines.append('%s%s %d' % (name,labels(plug,command),
+                                  data[(plug,command)][key]))
+
+    name = prefix + '_responses_total'
+    lines.append('# HELP %s Responses of plugs by HTTP status.' % name)
+    lines.append('# TYPE %s counter' % name)
+    for plug, command in keys:
+      for status, count in sorted(data[(plug,command)]['status'].items()):
+        lines.append('%s%s %d' % (name,labels(plug,command,('status',status)),
+                                  count))
+
+    name = prefix + '_errors_total'
+    lines.append('# HELP %s Failed plug requests by error type.' % name)
+    lines.append('# TYPE %s counter' % name)
+    for plug, command in keys:
+      for error, count in sorted(data[(plug,command)]['errors'].items()):
+        lines.append('%s%s %d' % (name,labels(plug,command,('error',error)),
+                                  count))
+    return '\n'.join(lines) + '\n'
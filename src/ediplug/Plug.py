@@ -15,22 +15,49 @@ __author__ = "Bernhard Bablok, https://github.com/bablokb"
 
 import sys
 import os
-import requests as req
-from xml.dom.minidom import getDOMImplementation
-from xml.dom.minidom import parseString
+import time
 
+from LazyModule import LazyModule as LazyModule
+from Codec import Codec as Codec
 from Schedule import Schedule as Schedule
 from TPoint import TPoint as TPoint
+from PlugSession import PlugSession as PlugSession
+from Batch import Batch as Batch
+from PlugError import PlugError, PlugConnectionError, PlugTimeoutError, \
+                      PlugUnavailableError, PlugHTTPError, PlugAuthError, \
+                      PlugResponseError
+
+req = LazyModule('requests')
 
 class Plug(object):
   """Base class of supported Edimax Plugs"""
 
+  # templates for schedule commands   ----------------------------------------
+
+  SCHEDULE_QUERY = "<SCHEDULE>" + \
+    ''.join(["<Device.System.Power.Schedule.%d/>" % d for d in range(7)]) + \
+    "</SCHEDULE>"
+  SCHEDULE_DAY = '<Device.System.Power.Schedule.%d value="ON">%s' + \
+                 '</Device.System.Power.Schedule.%d>'
+  SCHEDULE_LIST = '<Device.System.Power.Schedule.%d.List>%s' + \
+                  '</Device.System.Power.Schedule.%d.List>'
+
   # initialize Plug object   -------------------------------------------------
 
-  def __init__(self,ip,port=10000,user='admin',password='1234'):
+  def __init__(self,ip,port=10000,user='admin',password='1234',session=None,
+               scheduleTTL=None,metrics=None,breaker=None):
     self.__url = 'http://%s:%s/smartplug.cgi' % (ip,port)
+    self.__address = '%s:%s' % (ip,port)
+    self.__metrics = metrics                  # None: no instrumentation
+    self.__breaker = breaker                  # None: no circuit-breaker
     self.__cred = (user,password)
     self.__info = None
+    self.__session = session if session is not None else PlugSession(1,1)
+    self.__scheduleTTL = scheduleTTL          # None: no schedule-cache
+    self.__cache = None
+    self.__cacheTime = 0
+    self.__cacheHits = 0
+    self.__cacheMisses = 0
     self.__debug = True if os.getenv('DEBUG') is not None else False
 
     if self.__debug:
@@ -48,52 +75,154 @@ class Plug(object):
     
   # create XML command document   --------------------------------------------
   
-  def _getXML(self,cmdType):
-    doc = getDOMImplementation().createDocument(None, "SMARTPLUG", None)
-    doc.documentElement.setAttribute("id", "edimax")
-    
-    cmdElem = doc.createElement("CMD")
-    cmdElem.setAttribute("id", cmdType)
-    doc.documentElement.appendChild(cmdElem)
-    return (doc,cmdElem)
-
-  # post request and return DOM   ---------------------------------------------
-  
-  def _postCmd(self,doc):
+  def _getXML(self,cmdType,body=''):
+    return Codec.document(cmdType,body)
+
+  # post request and return root element of result   -------------------------
+  # (build is the time needed to create the document, command the name of
+  # the command for the metrics, both are only used with metrics. Errors
+  # are raised as PlugError)
+
+  def _postCmd(self,doc,build=None,command=None):
+    if self.__breaker is not None and not self.__breaker.allow():
+      error = PlugUnavailableError("circuit-breaker open",self.__url)
+      if self.__metrics is not None:
+        self.__metrics.record(self.__address,command or Codec.command(doc),
+                              build,sent=len(doc),error=error)
+      raise error
+    if self.__metrics is not None:
+      return self.__postCmdMetrics(doc,build,command)
+    return self.__parse(self.__send(doc).content)
+
+  # send document and return response   ---------------------------------------
+  # (failures of the connection, of the request and server errors open the
+  # circuit-breaker, other HTTP errors show that the plug is alive)
+
+  def __send(self,doc):
     if self.__debug:
-      sys.stderr.write(doc.toprettyxml())
-      
-    res = req.post(self.__url, auth=self.__cred, files={'file': doc.toxml()})
+      sys.stderr.write(doc + "\n")
+
+    try:
+      res = self.__session.post(self.__url,self.__cred,doc)
+    except req.exceptions.Timeout as e:
+      self.__failure()
+      raise PlugTimeoutError("timeout",self.__url,e)
+    except req.exceptions.ConnectionError as e:
+      self.__failure()
+      raise PlugConnectionError("connection failed",self.__url,e)
+    except req.exceptions.RequestException as e:
+      self.__failure()
+      raise PlugError("request failed: %s" % e,self.__url,e)
+    except Exception:
+      self.__failure()                  # release a trial of the breaker
+      raise
+
     if self.__debug:
       print res
-    if res.status_code == req.codes.ok:
-      result = parseString(res.text)
+    status = res.status_code
+    if status >= 500:
+      self.__failure()
+    elif self.__breaker is not None:
+      self.__breaker.success()
+    if status == req.codes.ok:
       if self.__debug:
-        sys.stderr.write(result.toprettyxml())
-      return result
+        sys.stderr.write(res.content + "\n")
+      return res
+    elif status == req.codes.unauthorized:
+      raise PlugAuthError("authentication failed",self.__url,status)
     else:
-      # TODO: throw some exception??
-      pass
+      raise PlugHTTPError("HTTP status %d" % status,self.__url,status)
+
+  # record failure of a request   ---------------------------------------------
+
+  def __failure(self):
+    if self.__breaker is not None:
+      self.__breaker.failure()
+
+  # parse response   ----------------------------------------------------------
+
+  def __parse(self,content):
+    try:
+      return Codec.parse(content)
+    except SyntaxError as e:
+      raise PlugResponseError("invalid response: %s" % e,self.__url,e)
+
+  # post request and record metrics   -----------------------------------------
+
+  def __postCmdMetrics(self,doc,build,command):
+    if command is None:
+      command = Codec.command(doc)
+    network = parse = status = None
+    received = 0
+    try:
+      start    = time.time()
+      try:
+        res = self.__send(doc)
+      finally:
+        network = time.time() - start
+      status   = res.status_code
+      received = len(res.content)
+      start = time.time()
+      root  = self.__parse(res.content)
+      parse = time.time() - start
+    except Exception as e:
+      if isinstance(e,PlugHTTPError):
+        status = e.status
+      self.__metrics.record(self.__address,command,build,network,parse,
+                            len(doc),received,status,e)
+      raise
+    self.__metrics.record(self.__address,command,build,network,parse,
+                          len(doc),received,status)
+    return root
+
+  # set circuit-breaker (None: disable)   -------------------------------------
+
+  def setBreaker(self,breaker):
+    self.__breaker = breaker
+
+  # return circuit-breaker   --------------------------------------------------
+
+  def getBreaker(self):
+    return self.__breaker
+
+  # set metrics (None: disable instrumentation)   -----------------------------
+
+  def setMetrics(self,metrics):
+    self.__metrics = metrics
+
+  # return metrics   ----------------------------------------------------------
+
+  def getMetrics(self):
+    return self.__metrics
 
   # execute generic command   ------------------------------------------------
 
   def _execCommand(self,cmdType,tag,value=None):
-    doc, cmdElem = self._getXML(cmdType)
-    childElem = doc.createElement(tag)
-    cmdElem.appendChild(childElem)
-    if value is not None:
-      childElem.appendChild(doc.createTextNode(value))
-    return self._postCmd(doc)
+    if cmdType == 'get' and value is None:
+      return self._postCmd(Codec.query(tag))
+    start = time.time()
+    doc   = Codec.document(cmdType,Codec.element(tag,value))
+    return self._postCmd(doc,time.time()-start)
 
   # return url of plug   ------------------------------------------------------
 
   def getUrl(self):
     return self.__url
+
+  # return HTTP-session of plug   ---------------------------------------------
+
+  def getSession(self):
+    return self.__session
+
+  # create a batch of queries   -----------------------------------------------
+
+  def batch(self,merge=True):
+    return Batch(self,merge)
   
   # parse result of command   -------------------------------------------------
 
-  def _parseResult(self,dom):
-    value = dom.getElementsByTagName("CMD")[0].firstChild.nodeValue
+  def _parseResult(self,root):
+    value = Codec.findText(root,"CMD")
     return True if value == 'OK' else False
     
   # query name and type of plug   --------------------------------------------
@@ -107,89 +236,210 @@ class Plug(object):
   def getSysInfo(self):
     if self.__info is not None:
       return self.__info
-    
-    dom = self._execCommand('get',"SYSTEM_INFO")
+    return self._parseSysInfo(self._execCommand('get',"SYSTEM_INFO"))
+
+  # set system-info (e.g. already queried during discovery)   ----------------
+
+  def _setSysInfo(self,info):
+    self.__info = info
+
+  # parse system-info from result of command   --------------------------------
+
+  def _parseSysInfo(self,root):
     info = {}
-    tags = dom.getElementsByTagName("SYSTEM_INFO")[0].childNodes
-    for tag in tags:
-      if tag.tagName == "SUPPORT":
-        for supportTag in tag.childNodes:
-          info[supportTag.tagName] = supportTag.firstChild.nodeValue
+    for tag in Codec.find(root,"SYSTEM_INFO"):
+      if tag.tag == "SUPPORT":
+        for supportTag in tag:
+          info[supportTag.tag] = supportTag.text
       else:
-        if tag.hasChildNodes():
-          info[tag.tagName] = tag.firstChild.nodeValue
+        if tag.text is not None:
+          info[tag.tag] = tag.text
     self.__info = info
     return info
 
   # query power-state   ------------------------------------------------------
 
   def getPowerState(self):
-    dom = self._execCommand('get',"Device.System.Power.State")
-    value = dom.getElementsByTagName("Device.System.Power.State")[0].\
-                                                          firstChild.nodeValue
+    return self._parsePowerState(
+                          self._execCommand('get',"Device.System.Power.State"))
+
+  # parse power-state from result of command   --------------------------------
+
+  def _parsePowerState(self,root):
+    value = Codec.findText(root,"Device.System.Power.State")
     return True if value == 'ON' else False
 
   # set power-state   ---------------------------------------------------------
 
   def setPowerState(self,active=True):
     value = 'ON' if active else 'OFF'
-    dom = self._execCommand('setup',"Device.System.Power.State",value)
-    return self._parseResult(dom)
+    root = self._execCommand('setup',"Device.System.Power.State",value)
+    return self._parseResult(root)
 
-  # query schedule   ----------------------------------------------------------
+  # return schedule from cache (or None if not cached or stale)   -------------
 
-  def getSchedule(self,schedule=None,getDom=False):
+  def __getCachedSchedule(self,schedule):
+    cache = self.__validCache()
+    if cache is None:
+      self.__cacheMisses += 1
+      return None
+    self.__cacheHits += 1
     if schedule is None:
-      schedule = Schedule()
-    days = [ i for i in range(7) ]
+      return cache.copy()
+    for d in range(7):
+      schedule.fromTransport(cache.toTransport(d),d)
+    return schedule
 
-    # build command-xml ...
-    doc, cmdElem = self._getXML('get')
-    schedElem = doc.createElement("SCHEDULE")
-    cmdElem.appendChild(schedElem)
-    
-    if not getDom:      # return full information
+  # return cached schedule if it is still valid (without copying it)   ------
+
+  def __validCache(self):
+    if self.__cache is None or \
+               time.time() - self.__cacheTime >= self.__scheduleTTL:
+      return None
+    return self.__cache
+
+  # update cache with the days written to the plug   --------------------------
+
+  def __updateCache(self,schedule,days):
+    if len(days) == 7:
+      self.__cache = schedule.copy()
+      self.__cacheTime = time.time()
+    elif self.__cache is not None:
       for d in days:
-        dayElem = doc.createElement("Device.System.Power.Schedule."+str(d))
-        schedElem.appendChild(dayElem)
+        self.__cache.fromTransport(schedule.toTransport(d),d)
+    if self.__cache is not None:
+      self.__cache.markClean(days,self.__url)
+
+  # invalidate cached schedule   ----------------------------------------------
+
+  def invalidateSchedule(self):
+    self.__cache = None
+
+  # return hit/miss counters of the schedule-cache   --------------------------
 
-    # ... post and parse the result
-    dom = self._postCmd(doc)
+  def getCacheStats(self):
+    return {'hits': self.__cacheHits, 'misses': self.__cacheMisses}
+
+  # query schedule   ----------------------------------------------------------
+  # (with a schedule-cache, a cached copy is returned unless it is stale or
+  # refresh is True)
+
+  def getSchedule(self,schedule=None,getDom=False,refresh=False):
+    if self.__scheduleTTL is not None and not getDom:
+      if refresh:
+        self.__cacheMisses += 1
+      else:
+        cached = self.__getCachedSchedule(schedule)
+        if cached is not None:
+          return cached
+
+    # post query and parse the result (getDom returns the raw result)
     if getDom:
-      return dom
-    
-    tags = dom.getElementsByTagName("SCHEDULE")[0].childNodes
-    for tag in tags:
-      name = tag.tagName
+      return self._execCommand('get',"SCHEDULE")
+    return self._parseSchedule(
+                  self._postCmd(Codec.document('get',self._getScheduleQuery())),
+                  schedule)
+
+  # return query of all days (body of command-document)   --------------------
+
+  def _getScheduleQuery(self):
+    return Plug.SCHEDULE_QUERY
+
+  # parse schedule from result of command   -----------------------------------
+
+  def _parseSchedule(self,root,schedule=None):
+    if schedule is None:
+      schedule = Schedule()
+    days = []
+    for tag in Codec.find(root,"SCHEDULE"):
+      name = tag.tag
       if name.find('List') > 0:
         continue
-      day = name.split('.')[-1]
-      value = tag.firstChild.nodeValue
-      schedule.fromTransport(value,int(day))
+      day = int(name.split('.')[-1])
+      schedule.fromTransport(tag.text,day)
+      days.append(day)
+    schedule.markClean(days,self.__url)
+
+    if self.__scheduleTTL is not None:
+      self.__updateCache(schedule,range(7))
     return schedule
 
   # set schedule (for a given day)   ------------------------------------------
-
-  def setSchedule(self,schedule,day=None):
-    doc, cmdElem = self._getXML('setup')
-    schedElem = doc.createElement("SCHEDULE")
-    cmdElem.appendChild(schedElem)
-
-    # iterate over all days (either given day or all days)
-    # and add XML-node to command-document
-    
-    days = [day] if day is not None else [ i for i in range(7) ]
+  # (without a day, only days changed since the schedule was loaded from or
+  # written to this plug are sent, all days for a schedule of another plug
+  # or if force is True. With a valid schedule-cache, days equal to the
+  # cached schedule are skipped)
+
+  def setSchedule(self,schedule,day=None,force=False):
+    if day is not None:
+      days = [day]
+    elif force:
+      days = range(7)
+    else:
+      days = schedule.getDirtyDays(self.__url)
+      cached = self.__validCache()
+      if days and cached is not None:
+        changes = cached.diff(schedule)
+        self.__logChanges(changes)
+        days = [d for d in days if d in changes]
+    if not days:
+      return True                       # nothing changed
+
+    start  = time.time()
+    doc    = Plug._getScheduleDoc(schedule,days)
+    result = self._postSchedule(doc,schedule,days,time.time()-start)
+    if result:
+      schedule.markClean(days,self.__url)
+    return result
+
+  # set schedule, only sending the days which differ from the plug   -------
+  # (the current schedule is read from the plug or the schedule-cache)
+
+  def syncSchedule(self,schedule,refresh=False):
+    changes = self.getSchedule(refresh=refresh).diff(schedule)
+    self.__logChanges(changes)
+    if not changes:
+      schedule.markClean(origin=self.__url)
+      return True                       # nothing changed
+
+    days   = sorted(changes.keys())
+    start  = time.time()
+    doc    = Plug._getScheduleDoc(schedule,days)
+    result = self._postSchedule(doc,schedule,days,time.time()-start)
+    if result:
+      schedule.markClean(origin=self.__url)
+    return result
+
+  # log changes of a schedule (result of Schedule.diff)   --------------------
+
+  def __logChanges(self,changes):
+    if not self.__debug:
+      return
+    if not changes:
+      sys.stderr.write("schedule unchanged\n")
+    for day in sorted(changes.keys()):
+      for (start,end,active) in changes[day]:
+        sys.stderr.write("schedule changed: %s - %s %s\n" %
+                         (start,end,'ON' if active else 'OFF'))
+
+  # create command-document setting the given days of a schedule   -----------
+  # (the document does not depend on the plug, so it can be sent to many)
+
+  @staticmethod
+  def _getScheduleDoc(schedule,days):
+    body = []
     for d in days:
-      dayElem = doc.createElement("Device.System.Power.Schedule."+str(d))
-      dayElem.setAttribute("value","ON")
-      dayElem.appendChild(doc.createTextNode(schedule.toTransport(d)))
-      schedElem.appendChild(dayElem)
+      body.append(Plug.SCHEDULE_DAY % (d,schedule.toTransport(d),d))
+      body.append(Plug.SCHEDULE_LIST % (d,schedule.getTransportSwitchList(d),d))
+    return Codec.document('setup',"<SCHEDULE>" + ''.join(body) + "</SCHEDULE>")
 
-      listElem = doc.createElement("Device.System.Power.Schedule."+str(d)+".List")
-      listElem.appendChild(doc.createTextNode(schedule.getTransportSwitchList(d)))
-      schedElem.appendChild(listElem)
+  # post a document created by _getScheduleDoc   -----------------------------
 
-    return self._parseResult(self._postCmd(doc))
+  def _postSchedule(self,doc,schedule,days,build=None):
+    result = self._parseResult(self._postCmd(doc,build))
+    if result and self.__scheduleTTL is not None:
+      self.__updateCache(schedule,days)
+    return result
 
   # set state for a given time-range   ----------------------------------------
   # (this only changes the schedule in the given range)
@@ -210,7 +460,7 @@ class Plug(object):
 
   def clear(self,active=True):
     sched = Schedule(active)
-    self.setSchedule(sched)
+    return self.setSchedule(sched)
 
   
 # -----------------------------------------------------------------------------
@@ -0,0 +1,56 @@
+#!/usr/bin/python
+
+# Class definitions of PlugError and its subclasses
+#
+# PlugError is the base class of all errors raised by plugs. The subclasses
+# tell apart plugs which are unreachable (connection error, timeout, open
+# circuit-breaker) from plugs answering with an error or an invalid
+# response.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+class PlugError(Exception):
+  """Base class of errors of plugs"""
+
+  # initialize PlugError object   --------------------------------------------
+
+  def __init__(self,message,url=None,cause=None):
+    super(PlugError,self).__init__(message)
+    self.url   = url                    # url of the plug (if known)
+    self.cause = cause                  # underlying exception (if any)
+
+  # string representation of error   -----------------------------------------
+
+  def __str__(self):
+    message = super(PlugError,self).__str__()
+    return "%s (%s)" % (message,self.url) if self.url else message
+
+class PlugConnectionError(PlugError):
+  """The plug is not reachable"""
+
+class PlugTimeoutError(PlugConnectionError):
+  """The plug did not answer in time"""
+
+class PlugUnavailableError(PlugConnectionError):
+  """The circuit-breaker of the plug is open"""
+
+class PlugHTTPError(PlugError):
+  """The plug answered with an HTTP error status"""
+
+  # initialize PlugHTTPError object   ----------------------------------------
+
+  def __init__(self,message,url=None,status=None,cause=None):
+    super(PlugHTTPError,self).__init__(message,url,cause)
+    self.status = status
+
+class PlugAuthError(PlugHTTPError):
+  """The plug rejected the credentials"""
+
+class PlugResponseError(PlugError,ValueError):
+  """The response of the plug is invalid"""
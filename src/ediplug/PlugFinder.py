@@ -15,16 +15,35 @@
 __author__ = "Bernhard Bablok, https://github.com/bablokb"
 
 import sys
-import socket
-import netifaces
-import netaddr
+import Queue
+import itertools
+from LazyModule import LazyModule as LazyModule
 from Plug import Plug as Plug
 from SP1101W import SP1101W as SP1101W
 from SP2101W import SP2101W as SP2101W
+from Executor import Executor as Executor
+from PlugError import PlugError as PlugError
+
+socket    = LazyModule('socket')     # only needed for discovery
+netifaces = LazyModule('netifaces')
+netaddr   = LazyModule('netaddr')
 
 class PlugFinder(object):
   """Search for Plugs in the network"""
 
+  # registry of supported models (Run.Model -> class)   ---------------------
+
+  MODELS = {
+    'SP1101W': SP1101W,
+    'SP2101W': SP2101W
+    }
+
+  # register class for a model   ---------------------------------------------
+
+  @staticmethod
+  def registerModel(model,constructor):
+    PlugFinder.MODELS[model] = constructor
+
   # get IP range of current network   ----------------------------------------
 
   @staticmethod
@@ -41,10 +60,13 @@ class PlugFinder(object):
     
   # initialize PlugFinder object   -------------------------------------------
 
-  def __init__(self,user='admin',password='1234',port=10000):
+  def __init__(self,user='admin',password='1234',port=10000,session=None,
+               cache=None):
     self.__user     = user
     self.__password = password
     self.__port     = port
+    self.__session  = session
+    self.__cache    = cache
     
   # check a given address/port combination if is available   -----------------
 
@@ -59,51 +81,189 @@ class PlugFinder(object):
       #print e
       return False
 
-  # add a plug to to the dictionary of all available plugs   -----------------
+  # create plug for the given address, returns (name,plug) or None   --------
 
-  def __add(self,plugs,plugnames,ip):
+  # (the system-info and session of the probe are passed to the final
+  # object, unknown models are created as generic Plug)
+
+  def __create(self,plugnames,ip):
     # query the name of the plug
-    plug = Plug(ip,self.__port,self.__user,self.__password)
-    name, type = plug.getNameAndType()
+    probe = Plug(ip,self.__port,self.__user,self.__password,self.__session)
+    info  = probe.getSysInfo()
+    name  = info.get('Device.System.Name',ip)
     if plugnames is None or name in plugnames:
-      constructor = globals()[type]
-      plugs[name] = constructor(ip,self.__port,self.__user,self.__password)
+      constructor = PlugFinder.MODELS.get(info.get('Run.Model'),Plug)
+      plug = constructor(ip,self.__port,self.__user,self.__password,
+                         probe.getSession())
+      plug._setSysInfo(info)
+      return (name,plug)
+    return None
+
+  # add a plug to to the dictionary of all available plugs   -----------------
+
+  def __add(self,plugs,plugnames,ip):
+    found = self.__create(plugnames,ip)
+    if found is not None:
+      plugs[found[0]] = found[1]
+
+  # check and create plug for the given address   ----------------------------
+  # (errors of the plug-protocol, e.g. another service listening on the
+  # port, mean that there is no plug at this address)
+
+  def __probe(self,plugnames,ip):
+    if self.__check(ip):
+      try:
+        return self.__create(plugnames,ip)
+      except PlugError:
+        return None
+    return None
+
+  # probe all addresses and yield (name,plug) as they are found   -----------
+  # (with workers > 1, at most 2*workers probes are in flight)
+
+  def __scan(self,iplist,plugnames,workers):
+    if workers <= 1:
+      for ip in iplist:
+        found = self.__probe(plugnames,str(ip))
+        if found is not None:
+          yield found
+      return
+
+    executor = Executor(workers)
+    done     = Queue.Queue()
+    pending  = 0
+    iplist   = iter(iplist)
+    try:
+      while True:
+        # keep the window of probes filled ...
+        for ip in iplist:
+          executor.submit(self.__probe,plugnames,str(ip)).addCallback(done.put)
+          pending += 1
+          if pending == 2*workers:
+            break
+        if pending == 0:
+          return
+        # ... and wait for the next probe to finish
+        found = done.get().result()
+        pending -= 1
+        if found is not None:
+          yield found
+    finally:
+      executor.shutdown(wait=False)
 
   # Create a Plug-instance for a specific address (Host or IP)   -------------
-  
+  # (with a cache, host may also be the name of a cached plug)
+
   def create(self,host):
     plugs = {}
     plugnames = None
-    if self.__check(host):
+    if self.__cache is not None:
+      entry = self.__cache.get(host)
+      if entry is not None and entry['port'] == self.__port and \
+                                                   self.__check(entry['ip']):
+        self.__add(plugs,[host],entry['ip'])
+    if not plugs and self.__check(host):
       self.__add(plugs,plugnames,host)
+    self.__remember(plugs.items())
+    if self.__cache is not None:
+      self.__cache.save()
     return plugs.values()[0]
 
-  # Search for all Plugs within the given network   --------------------------
+  # record plugs in the cache   ----------------------------------------------
 
-  def search(self,network=None,plugnames=None,maxCount=254):
-    plugs = {}
+  def __remember(self,found):
+    if self.__cache is None:
+      return
+    for name, plug in found:
+      self.__cache.update(name,PlugFinder.__ip(plug),self.__port,
+                          plug.getSysInfo().get('Run.Model'))
+
+  # extract ip from url of plug   ---------------------------------------------
+
+  @staticmethod
+  def __ip(plug):
+    return plug.getUrl().split('/')[2].rsplit(':',1)[0]
+
+  # return lazy iterator over the addresses of the given network   ---------
+  # and an object supporting the in-operator for addresses
+
+  def __network(self,network):
     # resolv network argument to a netaddr.IPNetwork
     if network is None:
       # autodetect network
-      iplist = [ip for ip in PlugFinder._getcidr().iter_hosts() ]
+      net = PlugFinder._getcidr()
+      return (net.iter_hosts(),net)
     elif network.find('-') > -1:
       network = network.split('-')
-      iplist = [ ip for ip in netaddr.IPRange(network[0],network[1]) ]
+      net = netaddr.IPRange(network[0],network[1])
+      return (iter(net),net)
     else:
       try:
-        iplist = [ ip for ip in netaddr.IPNetwork(network).iter_hosts() ]
+        net = netaddr.IPNetwork(network)
+        return (net.iter_hosts(),net)
       except netaddr.AddrFormatError as afe:
         # assume network is a single hostname
-        iplist = [ network ]
-      
-    for ip in iplist:
-      if self.__check(str(ip)):
-        self.__add(plugs,plugnames,str(ip))
-        if (plugnames is not None and len(plugnames) == len(plugs)) \
-                                                   or len(plugs) == maxCount:
-          # all requested plugs are already found, so return
-          return plugs
-    # ok, all IPs have been checked, so return all plugs found
+        return (iter([ network ]),[ network ])
+
+  # probe cached addresses within the network and yield (name,plug)   -------
+  # (addresses of found plugs are added to known)
+
+  def __cached(self,net,plugnames,known):
+    for name, entry in self.__cache.entries().items():
+      if plugnames is not None and name not in plugnames:
+        continue
+      if entry['port'] <> self.__port or entry['ip'] not in net:
+        continue
+      try:
+        found = self.__probe([name],entry['ip'])
+      except Exception as e:
+        found = None
+      if found is None:
+        self.__cache.remove(name)       # plug moved or is offline
+      else:
+        known.add(entry['ip'])
+        yield found
+
+  # Search for Plugs within the given network and yield (name,plug)   -------
+  # (addresses are generated lazily, so memory usage does not depend on
+  # the size of the network. With a cache, cached addresses are probed
+  # first and the network is only scanned for the remaining plugs)
+
+  def iterSearch(self,network=None,plugnames=None,maxCount=254,workers=1):
+    names = set()
+    addresses, net = self.__network(network)
+    cached = []
+    if self.__cache is not None:
+      # probe cached plugs first and skip their addresses during the scan
+      known  = set()
+      cached = self.__cached(net,plugnames,known)
+      addresses = (ip for ip in addresses if str(ip) not in known)
+    scan = self.__scan(addresses,plugnames,workers)
+    try:
+      for name, plug in itertools.chain(cached,scan):
+        # record the plug before yielding it, the caller may stop early
+        names.add(name)
+        if self.__cache is not None:
+          self.__remember([(name,plug)])
+        yield (name,plug)
+        if (plugnames is not None and len(plugnames) == len(names)) \
+                                                  or len(names) == maxCount:
+          # all requested plugs are already found, so stop
+          return
+    finally:
+      scan.close()
+      if self.__cache is not None:
+        self.__cache.save()
+
+  # Search for all Plugs within the given network   --------------------------
+
+  def search(self,network=None,plugnames=None,maxCount=254,workers=1,
+             onFound=None):
+    plugs = {}
+    for name, plug in self.iterSearch(network,plugnames,maxCount,workers):
+      plugs[name] = plug
+      if onFound is not None:
+        onFound(name,plug)
     return plugs
 
 # test   ---------------------------------------------------------------------
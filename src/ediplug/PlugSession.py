@@ -0,0 +1,89 @@
+#!/usr/bin/python
+
+# Class definition of PlugSession
+#
+# PlugSession wraps a pooled HTTP session (keep-alive connections) used by
+# Plug to post commands. A session is either owned by a single plug or
+# shared across a fleet of plugs. The underlying session (and the module
+# requests) is only created with the first command.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+import time
+import random
+import threading
+
+from LazyModule import LazyModule as LazyModule
+
+req = LazyModule('requests')
+
+class PlugSession(object):
+  """Pooled HTTP session for the communication with plugs"""
+
+  # initialize PlugSession object   ------------------------------------------
+
+  def __init__(self,poolConnections=10,poolSize=2,keepAlive=True,
+               connectTimeout=5.0,readTimeout=10.0,retries=0,backoff=0.5):
+    self.__session         = None
+    self.__lock            = threading.Lock()
+    self.__poolConnections = poolConnections
+    self.__poolSize        = poolSize
+    self.__keepAlive       = keepAlive
+
+    if connectTimeout is None and readTimeout is None:
+      self.__timeout = None
+    else:
+      self.__timeout = (connectTimeout,readTimeout)
+    self.__retries = retries
+    self.__backoff = backoff
+
+  # technical representation of session   -------------------------------------
+
+  def __repr__(self):
+    return "<PlugSession timeout:%s, retries:%d>" % (self.__timeout,
+                                                      self.__retries)
+
+  # return session, create it on first use   ---------------------------------
+
+  def __getSession(self):
+    with self.__lock:
+      if self.__session is None:
+        session = req.Session()
+        adapter = req.adapters.HTTPAdapter(
+          pool_connections=self.__poolConnections,pool_maxsize=self.__poolSize)
+        session.mount('http://',adapter)
+        if not self.__keepAlive:
+          session.headers['Connection'] = 'close'
+        self.__session = session
+      return self.__session
+
+  # post command-document   ---------------------------------------------------
+  # (connection errors and timeouts are retried with exponential backoff,
+  # the delay is jittered to spread the retries of many plugs)
+
+  def post(self,url,auth,doc):
+    session = self.__getSession()
+    attempt = 0
+    while True:
+      try:
+        return session.post(url,auth=auth,files={'file': doc},
+                                   timeout=self.__timeout)
+      except (req.exceptions.ConnectionError,req.exceptions.Timeout):
+        if attempt >= self.__retries:
+          raise
+        time.sleep(self.__backoff*(2**attempt)*random.uniform(0.5,1.0))
+        attempt += 1
+
+  # close all pooled connections   --------------------------------------------
+
+  def close(self):
+    with self.__lock:
+      session, self.__session = self.__session, None
+    if session is not None:
+      session.close()
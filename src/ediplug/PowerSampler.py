@@ -0,0 +1,178 @@
+#!/usr/bin/python
+
+# Class definition of PowerSampler
+#
+# PowerSampler polls the power-info of a number of SP2101W plugs at a fixed
+# rate. Ticks are scheduled relative to the start time, so the sampler does
+# not drift. Every sample is converted to numbers, timestamped and stored
+# in a RingBuffer per plug. The sampler keeps statistics about latency,
+# errors and missed deadlines. An optional callback receives every sample,
+# e.g. to write it to a PowerStore.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+import time
+import threading
+
+from Executor import Executor as Executor
+from RingBuffer import RingBuffer as RingBuffer
+
+class PowerSampler(object):
+  """Poll power-info of plugs at a fixed rate"""
+
+  # numeric fields of NOW_POWER   --------------------------------------------
+
+  FIELDS = [
+    'Device.System.Power.NowCurrent',
+    'Device.System.Power.NowPower',
+    'Device.System.Power.NowEnergy.Day',
+    'Device.System.Power.NowEnergy.Week',
+    'Device.System.Power.NowEnergy.Month'
+    ]
+
+  # initialize PowerSampler object   -----------------------------------------
+  # (plugs is a map name -> plug, e.g. the result of PlugFinder.search,
+  # the default executor has one worker per plug, but at most workers)
+
+  def __init__(self,plugs,interval=1.0,capacity=3600,fields=None,
+               workers=16,executor=None,onSample=None):
+    self.__plugs    = dict(plugs)
+    self.__interval = interval
+    self.__fields   = list(fields) if fields is not None else \
+                                                     PowerSampler.FIELDS
+    if executor is None:
+      executor = Executor(max(1,min(workers,len(self.__plugs))))
+    self.__executor = executor
+    self.__onSample = onSample
+    self.__buffers  = {}
+    self.__stats    = {}
+    self.__busy     = {}
+    for name in self.__plugs:
+      self.__buffers[name] = RingBuffer(capacity,['time'] + self.__fields)
+      self.__stats[name]   = {'samples': 0, 'errors': 0, 'missed': 0,
+                              'callbackErrors': 0, 'latencySum': 0.0,
+                              'latencyMax': 0.0}
+      self.__busy[name]    = False
+    self.__lock     = threading.Lock()
+    self.__stop     = threading.Event()
+    self.__thread   = None
+    self.__ticks    = 0
+    self.__lateTicks = 0
+
+  # convert power-info to numbers   -------------------------------------------
+
+  @staticmethod
+  def convert(info,fields=None):
+    if fields is None:
+      fields = PowerSampler.FIELDS
+    sample = {}
+    for field in fields:
+      try:
+        sample[field] = float(info[field])
+      except (KeyError,TypeError,ValueError):
+        pass
+    return sample
+
+  # return ring-buffer of the given plug   ------------------------------------
+
+  def getBuffer(self,name):
+    return self.__buffers[name]
+
+  # return statistics of the given plug   -------------------------------------
+
+  def getStats(self,name):
+    with self.__lock:
+      stats = dict(self.__stats[name])
+    latencySum = stats.pop('latencySum')
+    stats['latencyMean'] = latencySum/stats['samples'] if stats['samples'] \
+                                                                     else None
+    return stats
+
+  # return statistics of the sampler itself   ---------------------------------
+  # (lateTicks counts ticks skipped because the sampler fell behind)
+
+  def getSamplerStats(self):
+    return {'ticks': self.__ticks, 'lateTicks': self.__lateTicks}
+
+  # sample a single plug (executed by a worker)   -----------------------------
+  # (the plug is released in any case, a failing onSample only counts as
+  # callback error, the sample itself is kept)
+
+  def __sample(self,name,plug):
+    start = time.time()
+    try:
+      try:
+        info = plug.getPowerInfo()
+      except Exception as e:
+        with self.__lock:
+          self.__stats[name]['errors'] += 1
+        return
+      latency = time.time() - start
+      sample  = PowerSampler.convert(info,self.__fields)
+      sample['time'] = start
+      self.__buffers[name].append(sample)
+      with self.__lock:
+        stats = self.__stats[name]
+        stats['samples']    += 1
+        stats['latencySum'] += latency
+        stats['latencyMax']  = max(stats['latencyMax'],latency)
+      if self.__onSample is not None:
+        try:
+          self.__onSample(name,sample)
+        except Exception as e:
+          with self.__lock:
+            self.__stats[name]['callbackErrors'] += 1
+    finally:
+      with self.__lock:
+        self.__busy[name] = False
+
+  # start sampling of all plugs   ---------------------------------------------
+  # (a plug still busy with the last sample misses the deadline of this tick)
+
+  def __tick(self):
+    self.__ticks += 1
+    for name, plug in self.__plugs.items():
+      with self.__lock:
+        if self.__busy[name]:
+          self.__stats[name]['missed'] += 1
+          continue
+        self.__busy[name] = True
+      self.__executor.submit(self.__sample,name,plug)
+
+  # sampling loop (count: number of ticks, None: until stopped)   ------------
+
+  def run(self,count=None):
+    start = time.time()
+    tick  = 0
+    while not self.__stop.is_set() and (count is None or tick < count):
+      self.__tick()
+      # schedule next tick relative to start, skip ticks which have
+      # completely passed (i.e. the following tick is also overdue)
+      tick += 1
+      late  = int((time.time() - start)/self.__interval) - tick
+      if late > 0:
+        self.__lateTicks += late
+        tick += late
+      self.__stop.wait(max(0,start + tick*self.__interval - time.time()))
+
+  # run sampling loop in a background thread   --------------------------------
+
+  def start(self):
+    self.__stop.clear()
+    self.__thread = threading.Thread(target=self.run)
+    self.__thread.daemon = True
+    self.__thread.start()
+
+  # stop sampling loop   ------------------------------------------------------
+
+  def stop(self):
+    self.__stop.set()
+    if self.__thread is not None:
+      self.__thread.join()
+      self.__thread = None
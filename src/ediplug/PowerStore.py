@@ -0,0 +1,286 @@
+#!/usr/bin/python
+
+# Class definition of PowerStore
+#
+# PowerStore is an append-only, columnar on-disk store for power samples.
+# Every plug has its own directory (named after the encoded plug name)
+# with segments. A segment consists of one file per column (the first
+# column is the timestamp), every value is a fixed-width double in native
+# byte-order. Segments are rotated after a given number of rows. Reading memory-maps the segments and uses binary
+# search on the timestamps, so only the requested time-range is copied.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+import os
+import re
+import mmap
+import struct
+import threading
+from array import array
+
+class PowerStore(object):
+  """Columnar store of power samples"""
+
+  # default columns (the time column is always added)   ----------------------
+
+  COLUMNS = [
+    'Device.System.Power.NowCurrent',
+    'Device.System.Power.NowPower'
+    ]
+
+  WIDTH       = 8                       # bytes per value (double)
+  BUFFER      = 1024                    # rows buffered before writing
+  SEGMENT_RE  = re.compile(r'^seg-(\d{8})\.c0$')
+  UNSAFE_RE   = re.compile(r'[^A-Za-z0-9_ .-]|^\.')
+  ESCAPE_RE   = re.compile(r'%([0-9A-F]{2})')
+
+  # initialize PowerStore object   -------------------------------------------
+
+  def __init__(self,path,columns=None,segmentSize=86400):
+    self.__path        = os.path.expanduser(path)
+    self.__columns     = ['time'] + list(columns if columns is not None
+                                                   else PowerStore.COLUMNS)
+    self.__segmentSize = segmentSize
+    self.__writers     = {}             # name -> [segment,rows,files,buffers]
+    self.__lock        = threading.Lock()
+
+  # technical representation of store   ---------------------------------------
+
+  def __repr__(self):
+    return "<PowerStore: %s, columns: %s>" % (self.__path,self.__columns)
+
+  # return columns of the store   ---------------------------------------------
+
+  def getColumns(self):
+    return list(self.__columns)
+
+  # return names of all plugs in the store   ----------------------------------
+
+  def plugs(self):
+    if not os.path.isdir(self.__path):
+      return []
+    return sorted([PowerStore._decode(name) for name in os.listdir(self.__path)
+                      if os.path.isdir(os.path.join(self.__path,name))])
+
+  # encode name of a plug as directory name   -------------------------------
+  # (plug names are set by users: characters other than letters, digits,
+  # '_', ' ', '.' and '-' and a leading '.' are escaped as %XX, so a name
+  # never leaves the store or creates nested directories)
+
+  @staticmethod
+  def _encode(name):
+    if not name:
+      raise ValueError("empty plug name")
+    if isinstance(name,unicode):
+      name = name.encode('utf-8')
+    return PowerStore.UNSAFE_RE.sub(lambda m: '%%%02X' % ord(m.group(0)),name)
+
+  # decode directory name   ---------------------------------------------------
+
+  @staticmethod
+  def _decode(dirname):
+    return PowerStore.ESCAPE_RE.sub(lambda m: chr(int(m.group(1),16)),dirname)
+
+  # return directory of a plug   ----------------------------------------------
+
+  def __directory(self,name):
+    return os.path.join(self.__path,PowerStore._encode(name))
+
+  # return filename of a column of a segment   -------------------------------
+
+  def __file(self,name,segment,column):
+    return os.path.join(self.__directory(name),
+                        'seg-%08d.c%d' % (segment,column))
+
+  # return sorted segment numbers of a plug   --------------------------------
+
+  def __segments(self,name):
+    directory = self.__directory(name)
+    if not os.path.isdir(directory):
+      return []
+    segments = []
+    for filename in os.listdir(directory):
+      match = PowerStore.SEGMENT_RE.match(filename)
+      if match:
+        segments.append(int(match.group(1)))
+    return sorted(segments)
+
+  # open files of a segment for appending   ----------------------------------
+  # (the columns are written one after another, so after a crash they may
+  # differ in length: all columns are truncated to the complete rows)
+
+  def __open(self,name,segment):
+    paths = [self.__file(name,segment,i) for i in range(len(self.__columns))]
+    sizes = [os.path.getsize(path) if os.path.exists(path) else 0
+                                                           for path in paths]
+    rows  = min(sizes) // PowerStore.WIDTH
+    for path, size in zip(paths,sizes):
+      if size > rows*PowerStore.WIDTH:
+        with open(path,'r+b') as f:
+          f.truncate(rows*PowerStore.WIDTH)
+    files = [open(path,'ab') for path in paths]
+    return [segment,rows,files,[array('d') for f in files]]
+
+  # write buffered rows of a writer   -----------------------------------------
+
+  @staticmethod
+  def __write(writer):
+    for f, buffer in zip(writer[2],writer[3]):
+      buffer.tofile(f)
+      del buffer[:]
+      f.flush()
+
+  # return writer of a plug (rotate segment if it is full)   ----------------
+
+  def __writer(self,name):
+    writer = self.__writers.get(name)
+    if writer is None:
+      directory = self.__directory(name)
+      if not os.path.isdir(directory):
+        os.makedirs(directory)
+      segments = self.__segments(name)
+      writer = self.__open(name,segments[-1] if segments else 1)
+    if writer[1] >= self.__segmentSize:
+      PowerStore.__write(writer)
+      for f in writer[2]:
+        f.close()
+      writer = self.__open(name,writer[0]+1)
+    self.__writers[name] = writer
+    return writer
+
+  # append a sample (map column -> value) of a plug   -------------------------
+  # (timestamps must not decrease, missing values are stored as NaN)
+
+  def append(self,name,sample):
+    row = [sample.get(column,float('nan')) for column in self.__columns]
+    with self.__lock:
+      writer = self.__writer(name)
+      for value, buffer in zip(row,writer[3]):
+        buffer.append(value)
+      writer[1] += 1
+      if len(writer[3][0]) >= PowerStore.BUFFER:
+        PowerStore.__write(writer)
+
+  # append many samples of a plug at once   -----------------------------------
+  # (takes the lock once and fills the column buffers with array.extend,
+  # much faster than append for imports and backfills)
+
+  def extend(self,name,samples):
+    nan     = float('nan')
+    samples = list(samples)
+    columns = [array('d',[sample.get(column,nan) for sample in samples])
+                                                 for column in self.__columns]
+    with self.__lock:
+      done = 0
+      while done < len(samples):
+        writer = self.__writer(name)
+        count  = min(len(samples)-done,self.__segmentSize-writer[1])
+        for values, buffer in zip(columns,writer[3]):
+          buffer.extend(values[done:done+count])
+        writer[1] += count
+        done      += count
+        if len(writer[3][0]) >= PowerStore.BUFFER:
+          PowerStore.__write(writer)
+
+  # write buffered samples to disk   ------------------------------------------
+
+  def flush(self):
+    with self.__lock:
+      for writer in self.__writers.values():
+        PowerStore.__write(writer)
+
+  # close all files   ---------------------------------------------------------
+
+  def close(self):
+    with self.__lock:
+      for writer in self.__writers.values():
+        PowerStore.__write(writer)
+        for f in writer[2]:
+          f.close()
+      self.__writers = {}
+
+  # memory-map a file (None if the file is empty)   --------------------------
+
+  @staticmethod
+  def __map(filename):
+    with open(filename,'rb') as f:
+      if os.fstat(f.fileno()).st_size == 0:
+        return None
+      return mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+
+  # binary search: first row with timestamp >= t   ---------------------------
+
+  @staticmethod
+  def __bisect(times,rows,t):
+    low, high = 0, rows
+    while low < high:
+      mid = (low+high) // 2
+      if struct.unpack_from('d',times,mid*PowerStore.WIDTH)[0] < t:
+        low = mid + 1
+      else:
+        high = mid
+    return low
+
+  # read samples of a plug with start <= time < end   ------------------------
+  # (returns a map column -> array of values)
+
+  def read(self,name,start=None,end=None,columns=None):
+    if columns is None:
+      columns = self.__columns
+    indices = [self.__columns.index(column) for column in columns]
+    result  = dict([(column,array('d')) for column in columns])
+    self.flush()
+
+    for segment in self.__segments(name):
+      times = PowerStore.__map(self.__file(name,segment,0))
+      if times is None:
+        continue
+      try:
+        # only complete rows are read
+        rows = min([os.path.getsize(self.__file(name,segment,i))
+                    for i in range(len(self.__columns))]) // PowerStore.WIDTH
+        first = 0 if start is None else PowerStore.__bisect(times,rows,start)
+        last  = rows if end is None else PowerStore.__bisect(times,rows,end)
+      finally:
+        times.close()
+      if first >= last:
+        continue
+      for column, index in zip(columns,indices):
+        data = PowerStore.__map(self.__file(name,segment,index))
+        try:
+          result[column].fromstring(data[first*PowerStore.WIDTH:
+                                         last*PowerStore.WIDTH])
+        finally:
+          data.close()
+    return result
+
+  # downsample a column into buckets of step seconds   -----------------------
+  # (returns a list of (bucketStart,min,max,mean,count), NaNs are ignored)
+
+  def rollup(self,name,column,step,start=None,end=None):
+    data    = self.read(name,start,end,['time',column])
+    buckets = []
+    bucket  = None
+    for t, value in zip(data['time'],data[column]):
+      if value <> value:
+        continue
+      key = t - t % step
+      if bucket is None or bucket[0] <> key:
+        if bucket is not None:
+          buckets.append((bucket[0],bucket[1],bucket[2],bucket[3]/bucket[4],
+                          bucket[4]))
+        bucket = [key,value,value,0.0,0]
+      bucket[1] = min(bucket[1],value)
+      bucket[2] = max(bucket[2],value)
+      bucket[3] += value
+      bucket[4] += 1
+    if bucket is not None:
+      buckets.append((bucket[0],bucket[1],bucket[2],bucket[3]/bucket[4],
+                      bucket[4]))
+    return buckets
@@ -0,0 +1,95 @@
+#!/usr/bin/python
+
+# Class definition of RingBuffer
+#
+# RingBuffer keeps the last samples of a number of numeric columns (e.g.
+# timestamp and power values) in preallocated arrays. Once the buffer is
+# full, new samples overwrite the oldest ones.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+from array import array
+
+class RingBuffer(object):
+  """Fixed size buffer of numeric samples"""
+
+  # initialize RingBuffer object   -------------------------------------------
+
+  def __init__(self,capacity,columns):
+    self.__capacity = capacity
+    self.__columns  = list(columns)
+    self.__data     = dict([(column,array('d',[0.0])*capacity)
+                                                  for column in self.__columns])
+    self.__next     = 0                 # index of next sample
+    self.__count    = 0                 # number of valid samples
+
+  # number of samples in buffer   ---------------------------------------------
+
+  def __len__(self):
+    return self.__count
+
+  # technical representation of buffer   --------------------------------------
+
+  def __repr__(self):
+    return "<RingBuffer: %d/%d samples, columns: %s>" % (
+                                 self.__count,self.__capacity,self.__columns)
+
+  # return names of columns   -------------------------------------------------
+
+  def getColumns(self):
+    return list(self.__columns)
+
+  # append a sample (map column -> value, missing columns are set to NaN)   --
+
+  def append(self,sample):
+    index = self.__next
+    for column in self.__columns:
+      self.__data[column][index] = sample.get(column,float('nan'))
+    self.__next  = (index+1) % self.__capacity
+    self.__count = min(self.__count+1,self.__capacity)
+
+  # return values of a column (oldest first)   --------------------------------
+
+  def values(self,column):
+    data = self.__data[column]
+    if self.__count < self.__capacity:
+      return data[:self.__count]
+    return data[self.__next:] + data[:self.__next]
+
+  # return last sample as map   -----------------------------------------------
+
+  def last(self):
+    if not self.__count:
+      return None
+    index = (self.__next-1) % self.__capacity
+    return dict([(column,self.__data[column][index])
+                                                for column in self.__columns])
+
+  # return valid (not NaN) values of a column   ------------------------------
+
+  def _valid(self,column):
+    return [value for value in self.values(column) if value == value]
+
+  # minimum of a column (None if there are no valid values)   ---------------
+
+  def min(self,column):
+    values = self._valid(column)
+    return min(values) if values else None
+
+  # maximum of a column (None if there are no valid values)   ---------------
+
+  def max(self,column):
+    values = self._valid(column)
+    return max(values) if values else None
+
+  # mean of a column (None if there are no valid values)   ------------------
+
+  def mean(self,column):
+    values = self._valid(column)
+    return sum(values)/len(values) if values else None
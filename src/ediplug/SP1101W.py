@@ -19,6 +19,8 @@ class SP1101W(Plug):
 
   # initialize Plug object   -------------------------------------------------
 
-  def __init__(self,ip,port=10000,user='admin',password='1234'):
-    super(SP1101W,self).__init__(ip,port,user,password)
+  def __init__(self,ip,port=10000,user='admin',password='1234',session=None,
+               scheduleTTL=None,metrics=None,breaker=None):
+    super(SP1101W,self).__init__(ip,port,user,password,session,scheduleTTL,
+                                 metrics,breaker)
 
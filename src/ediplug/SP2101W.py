@@ -13,23 +13,28 @@
 __author__ = "Bernhard Bablok, https://github.com/bablokb"
 
 from Plug import Plug as Plug
+from Codec import Codec as Codec
 
 class SP2101W(Plug):
   """Implement behaviour of the  Edimax SP2101W Plug"""
 
   # initialize Plug object   -------------------------------------------------
 
-  def __init__(self,ip,port=10000,user='admin',password='1234'):
-    super(SP2101W,self).__init__(ip,port,user,password)
+  def __init__(self,ip,port=10000,user='admin',password='1234',session=None,
+               scheduleTTL=None,metrics=None,breaker=None):
+    super(SP2101W,self).__init__(ip,port,user,password,session,scheduleTTL,
+                                 metrics,breaker)
 
   # query power-info   ------------------------------------------------------
 
   def getPowerInfo(self):
-    
-    dom = self._execCommand('get',"NOW_POWER")
+    return self._parsePowerInfo(self._execCommand('get',"NOW_POWER"))
+
+  # parse power-info from result of command   --------------------------------
+
+  def _parsePowerInfo(self,root):
     info = {}
-    tags = dom.getElementsByTagName("NOW_POWER")[0].childNodes
-    for tag in tags:
-      if tag.hasChildNodes():
-        info[tag.tagName] = tag.firstChild.nodeValue
+    for tag in Codec.find(root,"NOW_POWER"):
+      if tag.text is not None:
+        info[tag.tag] = tag.text
     return info
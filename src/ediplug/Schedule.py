@@ -3,7 +3,9 @@
 # Class definition of Schedule
 #
 # Schedule holds the low-level datastructure of a weekly schedule.
-# It is implemented as a list of 1 or 0
+# It is implemented as a bitmask (a single long) with one bit per minute.
+# The first minute of the week is the most significant bit, so the
+# transport format of a day is just the hex-representation of its bits.
 #
 # This file is part of the project https://github.com/bablokb/ediplug
 #
@@ -13,9 +15,21 @@
 
 from TPoint import TPoint as TPoint
 
+WEEK    = 10080                     # minutes per week
+DAY     = 1440                      # minutes per day
+ALL     = (1 << WEEK) - 1           # bitmask of a complete week
+DAYMASK = (1 << DAY) - 1            # bitmask of a single day
+ONES    = ['1']*WEEK                # shared by all schedules (getState)
+
 class Schedule(object):
   """Schedule data-object"""
 
+  # return bitmask for the minute-range [start,end)   -----------------------
+
+  @staticmethod
+  def _mask(start,end):
+    return ((1 << (end-start)) - 1) << (WEEK-end)
+
   # Constructor. If argument is true, it is initialized with 1, else 0 -------
   
   def __init__(self,active=True):
@@ -24,90 +38,290 @@ class Schedule(object):
   # Re-initialize structure   ------------------------------------------------
 
   def init(self,active=True):
-    val = '1' if active else '0'
-    self.__sched = list(10080*val)
+    self.__sched = ALL if active else 0
+    self._invalidate()
+    self.__clean = 0                  # bits as last loaded/written
+    self.__known = [False]*7          # days with valid clean bits
+    self.__origin = None              # plug (url) of the clean bits
+
+  # return an independent copy of this schedule   ----------------------------
+
+  def copy(self):
+    sched = Schedule(False)
+    sched.__sched = self.__sched
+    sched.__runs  = self.__runs
+    sched.__transport = list(self.__transport)
+    sched.__switchList = list(self.__switchList)
+    sched.__clean = self.__clean
+    sched.__known = list(self.__known)
+    sched.__origin = self.__origin
+    return sched
+
+  # invalidate values derived from the bits (called after every change)   --
+
+  def _invalidate(self):
+    self.__runs       = None
+    self.__transport  = [None]*7      # cached results of toTransport
+    self.__switchList = [None]*7      # cached results of getTransportSwitchList
+
+  # return bits of a single day   --------------------------------------------
+
+  @staticmethod
+  def _dayBits(bits,day):
+    return (bits >> (WEEK-(day+1)*DAY)) & DAYMASK
+
+  # return days changed since they were read from or written to a plug   ---
+  # (days of a new schedule are always dirty. The clean state belongs to a
+  # single plug, for any other origin all days are dirty)
+
+  def getDirtyDays(self,origin=None):
+    if origin is not None and origin <> self.__origin:
+      return range(7)
+    return [day for day in range(7) if not self.__known[day] or
+            Schedule._dayBits(self.__sched,day) <>
+                                       Schedule._dayBits(self.__clean,day)]
+
+  # mark the given days (default: all days) as unchanged   ------------------
+  # (with an origin, the days are marked as unchanged relative to this
+  # plug, all other days are unknown if the origin changes)
+
+  def markClean(self,days=None,origin=None):
+    if days is None:
+      days = range(7)
+    if origin is not None and origin <> self.__origin:
+      self.__known  = [False]*7
+      self.__origin = origin
+    for day in days:
+      shift = WEEK-(day+1)*DAY
+      self.__clean = (self.__clean & ~(DAYMASK << shift)) | \
+                     (self.__sched & (DAYMASK << shift))
+      self.__known[day] = True
+
+  # return value ('0' or '1') of the given minute   --------------------------
+
+  def _getValue(self,index):
+    return '1' if (self.__sched >> (WEEK-1-index%WEEK)) & 1 else '0'
+
+  # get the runs of active minutes, split at day boundaries   --------------
+  # (found with bit operations on the bits of every day: adding the lowest
+  # set bit clears the lowest run and sets the bit above it. The cost
+  # depends on the number of runs, the bits are never formatted. Cached
+  # until the next modification of the schedule)
+
+  def _getRuns(self):
+    if self.__runs is not None:
+      return self.__runs
+
+    runs = []
+    for day in range(7):
+      bits  = Schedule._dayBits(self.__sched,day)
+      end   = (day+1)*DAY + 1
+      found = []
+      while bits:
+        low  = bits & -bits             # last minute of the run
+        bits = bits + low
+        high = bits & -bits             # minute before the run
+        bits = bits ^ high
+        found.append((end-high.bit_length(),end-low.bit_length()))
+      found.reverse()
+      runs.append(found)
+    self.__runs = runs
+    return runs
 
   # get list of switch-points   ----------------------------------------------
+  # (a switch-point at the start of the day is only returned if the value
+  # differs from the last minute of the previous day)
 
   def getSwitchList(self,day):
     resultList = []
-    startIndex = day*1440
-    endIndex   = startIndex + 1439
-    dayList = self.__sched[startIndex:endIndex]
-    if self.__sched[startIndex-1] <> self.__sched[startIndex]:
-      resultList.append((TPoint.create(startIndex),dayList[0]))
-    val = dayList[0]
-    try:
-      index = dayList.index('1' if val=='0' else '0',1)
-      while index > 0:
-        val = dayList[index]
-        resultList.append((TPoint.create(startIndex+index),val))
-        index = dayList.index('1' if val=='0' else '0',index+1)
-    except ValueError:
-      pass
+    startIndex = day*DAY
+    endIndex   = startIndex + DAY
+    for (start,end) in self._getRuns()[day]:
+      resultList.append((TPoint.create(start),'1'))
+      if end < endIndex:
+        resultList.append((TPoint.create(end),'0'))
+
+    prev = self._getValue(startIndex-1)
+    if resultList and resultList[0][0].getIndex() == startIndex:
+      if prev == '1':
+        del resultList[0]
+    elif prev == '1':
+      resultList.insert(0,(TPoint.create(startIndex),'0'))
     return resultList
 
   # get the switch-points in transport-format   ------------------------------
-  
+  # (active ranges of the given day, independent of the previous day, a
+  # range up to the end of the day ends at 23:59)
+
   def getTransportSwitchList(self,day):
-    tplist = ""
-    list = self.getSwitchList(day)
-    i = 0
-    while i < len(list):
-      (tpstart,valstart) = list[i]
-      if valstart == '1':
-        if i < len(list)-1:
-          (tpend,valend) = list[i+1]
-          i = i+1
-        else:
-          (tpend,valend) = (TPoint(day,23,59),'0')
-        if len(tplist):
-          tplist += "-" + tpstart.toTransport() + tpend.toTransport() + "1"
-        else:
-          tplist = tpstart.toTransport() + tpend.toTransport() + "1"
-      i = i + 1
-    return tplist
-  
+    value = self.__switchList[day]
+    if value is None:
+      startIndex = day*DAY
+      value = "-".join([TPoint.TRANSPORT[start-startIndex] +
+                        TPoint.TRANSPORT[min(end-startIndex,DAY-1)] + "1"
+                                      for (start,end) in self._getRuns()[day]])
+      self.__switchList[day] = value
+    return value
+
   # convert to transport format   --------------------------------------------
 
   def toTransport(self,day):
-    # pack four values together
-    startIndex = day*360
-    endIndex   = startIndex + 360
-    out = [''.join(self.__sched[4*i:4*(i+1)]) \
-                                          for i in range(startIndex,endIndex)]
-    # convert to hex ...
-    out = [hex(int(i,2))[2:] for i in out]
-    # ... and return result
-    return ''.join(out).upper()
+    # every hex-digit packs four minutes
+    value = self.__transport[day]
+    if value is None:
+      value = '%0360X' % ((self.__sched >> (WEEK-(day+1)*DAY)) & DAYMASK)
+      self.__transport[day] = value
+    return value
 
   # convert from transport format   -----------------------------------------
+  # (the day is dirty afterwards, only the plug the value was read from
+  # marks it clean)
 
   def fromTransport(self,value,day):
-    sched = int('F'+value,16)        # the F is to preserve the length
-    startIndex = day*360             # it will be removed in the last line
-    endIndex   = startIndex + 360
-    # convert to list and assign
-    self.__sched[4*startIndex:4*endIndex] = list(bin(sched)[6:])
+    shift = WEEK-(day+1)*DAY
+    bits  = int(value,16) & DAYMASK
+    self.__sched = (self.__sched & ~(DAYMASK << shift)) | (bits << shift)
+    self._invalidate()
+    self.__known[day] = False
 
   # get state for timepoint-range   -----------------------------------------
+  # (the active runs are copied into a list of '0', so the cost depends on
+  # the length of the range and the number of runs within the range)
 
   def getState(self,start,end=None):
     # TODO: handle start > end
-    return self.__sched[start.getIndex():end.getIndex()]
+    startIndex = start.getIndex()
+    endIndex   = end.getIndex() if end is not None else WEEK
+    values     = ['0']*max(0,endIndex-startIndex)
+    runs       = self._getRuns()
+    for day in range(startIndex//DAY,min(7,(endIndex+DAY-1)//DAY)):
+      for (first,last) in runs[day]:
+        first = max(first,startIndex)
+        last  = min(last,endIndex)
+        if first < last:
+          values[first-startIndex:last-startIndex] = ONES[:last-first]
+    return values
 
   # set state for given timepoint-range   -----------------------------------
 
   def setState(self,start,end,active=True):
     # end itself is not included!
-    val = '1' if active else '0'
     startIndex = start.getIndex()
     endIndex   = end.getIndex()
     if endIndex >= startIndex:
-      self.__sched[startIndex:endIndex] = list((endIndex-startIndex)*val)
+      mask = Schedule._mask(startIndex,endIndex)
+    else:
+      mask = Schedule._mask(startIndex,WEEK) | Schedule._mask(0,endIndex)
+    if active:
+      self.__sched |= mask
     else:
-      self.__sched[startIndex:10080] = list((10080-startIndex)*val)
-      self.__sched[0:endIndex] = list(endIndex*val)
+      self.__sched &= ~mask
+    self._invalidate()
+
+  # return active ranges of the week as list of (start,end) TPoints   -------
+  # (built from the runs of _getRuns: a fixed cost per day and a few bit
+  # operations per switch-point. A schedule active for the complete week
+  # returns a single range with start == end)
+
+  def getIntervals(self):
+    intervals = []
+    for runs in self._getRuns():
+      for (start,end) in runs:
+        if intervals and intervals[-1][1] == start:
+          intervals[-1] = (intervals[-1][0],end)
+        else:
+          intervals.append((start,end))
+    return [(TPoint.create(start),TPoint.create(end))
+                                                 for (start,end) in intervals]
+
+  # return changes from this schedule to the other one   --------------------
+  # (map day -> list of (start,end,active) with TPoints start/end and the
+  # value of the other schedule within [start,end), ordered by start. An
+  # empty map means both schedules are equal)
+
+  def diff(self,other):
+    changed = self.__sched ^ other.__sched
+    result  = {}
+    if not changed:
+      return result
+    for active, bits in [(True,changed & other.__sched),
+                         (False,changed & ~other.__sched)]:
+      for day, runs in enumerate(Schedule._fromBits(bits)._getRuns()):
+        for (start,end) in runs:
+          result.setdefault(day,[]).append(
+                               (TPoint.create(start),TPoint.create(end),active))
+    for changes in result.values():
+      changes.sort(key=lambda change: change[0].getIndex())
+    return result
+
+  # apply changes returned by diff   ------------------------------------------
+
+  def patch(self,changes):
+    for day in changes:
+      for (start,end,active) in changes[day]:
+        self.setState(start,end,active)
+    return self
+
+  # create schedule which is active for the given (start,end) ranges   -----
+  # (every range is a mask-operation on the bits of the complete week)
+
+  @staticmethod
+  def fromIntervals(intervals):
+    sched = Schedule(False)
+    for (start,end) in intervals:
+      if start.getIndex() == end.getIndex():
+        return Schedule(True)
+      sched.setState(start,end,True)
+    return sched
+
+  # create schedule from bitmask   -------------------------------------------
+
+  @staticmethod
+  def _fromBits(bits):
+    sched = Schedule(False)
+    sched.__sched = bits & ALL
+    sched._invalidate()
+    return sched
+
+  # union: active if active in either schedule   ----------------------------
+
+  def __or__(self,other):
+    return Schedule._fromBits(self.__sched | other.__sched)
+
+  # intersection: active if active in both schedules   ----------------------
+
+  def __and__(self,other):
+    return Schedule._fromBits(self.__sched & other.__sched)
+
+  # difference: active in this schedule, but not in the other   -------------
+
+  def __sub__(self,other):
+    return Schedule._fromBits(self.__sched & ~other.__sched)
+
+  # symmetric difference: active in the minutes where schedules differ   ---
+
+  def __xor__(self,other):
+    return Schedule._fromBits(self.__sched ^ other.__sched)
+
+  # inversion: active if not active in this schedule   ----------------------
+
+  def __invert__(self):
+    return Schedule._fromBits(~self.__sched)
+
+  # equality   ---------------------------------------------------------------
+
+  def __eq__(self,other):
+    if not isinstance(other,Schedule):
+      return NotImplemented
+    return self.__sched == other.__sched
+
+  def __ne__(self,other):
+    result = self.__eq__(other)
+    return result if result is NotImplemented else not result
+
+  # schedules are mutable   --------------------------------------------------
+
+  __hash__ = None
 
   # string representation ---------------------------------------------------
 
@@ -120,7 +334,9 @@ class Schedule(object):
         part = tf[60*j:60*(j+1)]
         str += part[0:14] + " " + part[15:29] + " " + \
                part[30:44] + " " + part[45:59]
-      
+      str += "\n"
+    return str
+
   # repr function   ---------------------------------------------------------
   
   def __repr__(self):
@@ -0,0 +1,376 @@
+#!/usr/bin/python
+
+# Class definition of Scheduler
+#
+# Scheduler switches plugs from the host. It keeps the switch events of all
+# plugs in a single heap ordered by due time and a single thread fires the
+# due events with setPowerState on an Executor. Events may be one-off and
+# have sub-second resolution. Recurring rules fitting the weekly model of
+# the plugs (whole minutes, period dividing the week) are not kept on the
+# host but compiled to a Schedule per plug and uploaded, so the plugs switch
+# even if the host is down.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+import time
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+
+from Executor import Executor as Executor
+from Schedule import Schedule as Schedule
+from TPoint import TPoint as TPoint
+from TPoint import WEEK as WEEK
+from Fleet import Fleet as Fleet
+
+class Scheduler(object):
+  """Switch plugs from host-side timelines"""
+
+  # initialize Scheduler object   --------------------------------------------
+  # (plugs is a map name -> plug, e.g. the result of PlugFinder.search,
+  # onEvent is called with name, active and error (or None) of every event)
+
+  def __init__(self,plugs,workers=16,executor=None,onEvent=None):
+    self.__plugs    = dict(plugs)
+    if executor is None:
+      executor = Executor(max(1,min(workers,len(self.__plugs))))
+    self.__executor = executor
+    self.__onEvent  = onEvent
+    self.__heap     = []                # [due,seq,id,name,active,period]
+    self.__live     = {}                # id -> number of entries in heap
+    self.__dead     = 0                 # cancelled entries in heap
+    self.__rules    = {}                # id -> list of weekly rules
+    self.__deferred = {}                # id -> rules (not yet started)
+    self.__hosted   = set()             # compiled, but still switched here
+    self.__promoted = False             # deferred rules were compiled
+    self.__uploads  = False             # upload() was called
+    self.__uploaded = set()             # plugs with uploaded rules
+    self.__ids      = itertools.count(1)
+    self.__seq      = itertools.count()
+    self.__busy     = {}                # name -> next state or None
+    self.__cond     = threading.Condition()
+    self.__stopped  = False
+    self.__thread   = None
+    self.__stats    = {'fired': 0, 'errors': 0, 'coalesced': 0,
+                       'callbackErrors': 0, 'lagSum': 0.0, 'lagMax': 0.0}
+
+  # technical representation of scheduler   -----------------------------------
+
+  def __repr__(self):
+    return "<Scheduler: %d plugs, %d events, %d rules>" % (
+      len(self.__plugs),len(self.__heap)-self.__dead,len(self.__rules))
+
+  # convert datetime or timestamp to timestamp   ------------------------------
+
+  @staticmethod
+  def _toTime(when):
+    if isinstance(when,datetime):
+      return time.mktime(when.timetuple()) + when.microsecond/1e6
+    return float(when)
+
+  # convert duration (seconds or timedelta) to seconds   ---------------------
+
+  @staticmethod
+  def _toSeconds(duration):
+    if isinstance(duration,timedelta):
+      return duration.days*86400 + duration.seconds + \
+                                                  duration.microseconds/1e6
+    return float(duration)
+
+  # add entries to the heap (all entries share the id)   ---------------------
+
+  def __push(self,id,entries):
+    with self.__cond:
+      for entry in entries:
+        if entry[1] not in self.__plugs:
+          raise KeyError(entry[1])
+      first = self.__heap[0][0] if self.__heap else None
+      for (due,name,active,period) in entries:
+        heapq.heappush(self.__heap,
+                       [due,next(self.__seq),id,name,active,period])
+      self.__live[id] = self.__live.get(id,0) + len(entries)
+      if first is None or self.__heap[0][0] < first:
+        self.__cond.notify()          # wake up loop for the earlier event
+    return id
+
+  # switch plug at the given time (datetime or timestamp)   ------------------
+
+  def at(self,name,when,active=True):
+    return self.__push(next(self.__ids),
+                       [(Scheduler._toTime(when),name,active,None)])
+
+  # switch plug after the given delay (seconds or timedelta)   ---------------
+
+  def after(self,name,delay,active=True):
+    return self.at(name,time.time()+Scheduler._toSeconds(delay),active)
+
+  # set state of a plug within [start,end)   ---------------------------------
+  # (TPoints define a weekly rule compiled to the schedule of the plug,
+  # datetimes or timestamps a one-off window switched from the host)
+
+  def window(self,name,start,end,active=True):
+    id = next(self.__ids)
+    if isinstance(start,TPoint):
+      if name not in self.__plugs:
+        raise KeyError(name)
+      with self.__cond:
+        self.__rules[id] = [(name,start,end,active)]
+      return id
+    return self.__push(id,[(Scheduler._toTime(start),name,active,None),
+                           (Scheduler._toTime(end),name,not active,None)])
+
+  # set state of a plug for duration every period, starting at first   ------
+  # (the rule is compiled to the schedule of the plug if it fits the weekly
+  # model, i.e. whole minutes and a period dividing the week. A plug-schedule
+  # has no start date, so a rule starting in the future is switched from the
+  # host until its first occurrence and compiled then. Rules not fitting
+  # the weekly model are always switched from the host)
+
+  def every(self,name,period,duration,first,active=True):
+    period   = Scheduler._toSeconds(period)
+    duration = Scheduler._toSeconds(duration)
+    first    = Scheduler._toTime(first)
+    if not 0 < duration < period:
+      raise ValueError("duration must be positive and less than period")
+
+    id  = next(self.__ids)
+    now = time.time()
+    if period % 60 == 0 and duration % 60 == 0 and first % 60 == 0 and \
+                                                  (WEEK*60) % period == 0:
+      if name not in self.__plugs:
+        raise KeyError(name)
+      start = TPoint.fromDatetime(datetime.fromtimestamp(first))
+      step  = int(period)//60
+      rules = [(name,tp,tp+int(duration)//60,active)
+                            for tp in TPoint.range(start,start-1,step)]
+      if first <= now:
+        with self.__cond:
+          self.__rules[id] = rules
+        return id
+      with self.__cond:
+        self.__deferred[id] = rules
+
+    # skip periods which have already passed
+    if first + duration <= now:
+      first += ((now - first - duration)//period + 1)*period
+    return self.__push(id,[(first,name,active,period),
+                           (first+duration,name,not active,period)])
+
+  # cancel an event, window or rule   -----------------------------------------
+  # (compiled rules are removed from the plugs with the next upload)
+
+  def cancel(self,id):
+    with self.__cond:
+      found = self.__rules.pop(id,None) is not None
+      found = self.__deferred.pop(id,None) is not None or found
+      self.__hosted.discard(id)
+      count = self.__live.pop(id,0)
+      self.__dead += count
+      if self.__dead > len(self.__heap)//2:
+        # drop cancelled entries, keeps the heap (and the cost of
+        # push and pop) proportional to the number of live events
+        self.__heap = [entry for entry in self.__heap
+                                                 if entry[2] in self.__live]
+        heapq.heapify(self.__heap)
+        self.__dead = 0
+      return found or count > 0
+
+  # return number of pending host-side events   ------------------------------
+
+  def getPending(self):
+    with self.__cond:
+      return len(self.__heap) - self.__dead
+
+  # return compiled schedules (map name -> Schedule)   ----------------------
+  # (plugs with only OFF-windows are ON otherwise, all other plugs are OFF
+  # otherwise. OFF-windows take precedence over ON-windows)
+
+  def getSchedules(self):
+    with self.__cond:
+      rules = [rule for id in sorted(self.__rules.keys())
+                                                for rule in self.__rules[id]]
+    schedules = {}
+    for name in set([rule[0] for rule in rules]):
+      windows = [rule for rule in rules if rule[0] == name]
+      sched   = Schedule(not [rule for rule in windows if rule[3]])
+      for active in [True,False]:
+        for (n,start,end,a) in windows:
+          if a == active:
+            if start == end:
+              sched.init(active)
+            else:
+              sched.setState(start,end,active)
+      schedules[name] = sched
+    return schedules
+
+  # upload compiled schedules to the plugs   ---------------------------------
+  # (only changed days are sent, plugs without rules are cleared if they
+  # had rules before. Compiled rules which were started from the host are
+  # no longer switched from the host once they are uploaded. Returns a map
+  # name -> result as Fleet.execute)
+
+  def upload(self,refresh=False):
+    schedules = self.getSchedules()
+    with self.__cond:
+      self.__uploads = True
+      for name in self.__uploaded:
+        if name not in schedules:
+          schedules[name] = Schedule(False)
+      self.__uploaded = set(schedules.keys())
+    byPlug = dict([(self.__plugs[name],sched)
+                                       for name, sched in schedules.items()])
+    fleet = Fleet(dict([(name,self.__plugs[name]) for name in schedules]),
+                  executor=self.__executor)
+    results = fleet.execute(lambda plug: plug.syncSchedule(byPlug[plug],
+                                                           refresh),True)
+    with self.__cond:
+      for id in list(self.__hosted):
+        rules = self.__rules.get(id)
+        if rules is None or results.get(rules[0][0],{}).get('ok'):
+          self.__hosted.discard(id)
+          self.__dead += self.__live.pop(id,0)
+    return results
+
+  # return statistics   -------------------------------------------------------
+  # (lag is the delay between due time and the start of the command,
+  # coalesced counts events replaced by a later one for a busy plug)
+
+  def getStats(self):
+    with self.__cond:
+      stats = dict(self.__stats)
+      stats['pending'] = len(self.__heap) - self.__dead
+    lagSum = stats.pop('lagSum')
+    stats['lagMean'] = lagSum/stats['fired'] if stats['fired'] else None
+    return stats
+
+  # switch a plug (executed by a worker)   ------------------------------------
+  # (events arriving while the plug is busy only keep the latest state,
+  # so the events of a plug are applied in order)
+
+  def __fire(self,name,active,due):
+    while True:
+      start = time.time()
+      error = None
+      try:
+        if self.__plugs[name].setPowerState(active) is False:
+          error = RuntimeError("setPowerState failed")
+      except Exception as e:
+        error = e
+      with self.__cond:
+        lag = max(0.0,start - due)
+        stats = self.__stats
+        stats['fired']  += 1
+        stats['errors'] += error is not None
+        stats['lagSum'] += lag
+        stats['lagMax']  = max(stats['lagMax'],lag)
+        pending = self.__busy[name]
+        if pending is None:
+          del self.__busy[name]
+        else:
+          self.__busy[name] = None
+      if self.__onEvent is not None:
+        try:
+          self.__onEvent(name,active,error)
+        except Exception:
+          with self.__cond:
+            self.__stats['callbackErrors'] += 1
+      if pending is None:
+        return
+      active, due = pending
+
+  # pop all due events (called with lock held)   -----------------------------
+
+  def __popDue(self,now):
+    due = []
+    heap = self.__heap
+    while heap and heap[0][0] <= now:
+      entry = heapq.heappop(heap)
+      id = entry[2]
+      if id not in self.__live:
+        self.__dead -= 1
+        continue
+      dueTime = entry[0]
+      if id in self.__deferred:
+        # first occurrence of a deferred rule: compile it, the events stay
+        # on the host until the rule is uploaded
+        self.__rules[id] = self.__deferred.pop(id)
+        self.__hosted.add(id)
+        self.__promoted = self.__uploads
+      if entry[5] is not None:
+        # recurring event: schedule next occurrence (occurrences missed
+        # e.g. during a suspend of the host are skipped)
+        entry[0] += ((now - entry[0])//entry[5] + 1)*entry[5]
+        entry[1]  = next(self.__seq)
+        heapq.heappush(heap,entry)
+      else:
+        self.__live[id] -= 1
+        if not self.__live[id]:
+          del self.__live[id]
+      name = entry[3]
+      if name in self.__busy:
+        if self.__busy[name] is not None:
+          self.__stats['coalesced'] += 1
+        self.__busy[name] = (entry[4],dueTime)
+      else:
+        self.__busy[name] = None
+        due.append((name,entry[4],dueTime))
+    return due
+
+  # event loop (until: timestamp, None: until stopped)   ---------------------
+
+  def run(self,until=None):
+    while True:
+      with self.__cond:
+        while True:
+          if self.__stopped:
+            self.__stopped = False
+            return
+          now = time.time()
+          if until is not None and now >= until:
+            return
+          due = self.__popDue(now)
+          promoted, self.__promoted = self.__promoted, False
+          if due or promoted:
+            break
+          wait = self.__heap[0][0] - now if self.__heap else None
+          if until is not None:
+            wait = until - now if wait is None else min(wait,until - now)
+          self.__cond.wait(wait)
+      if promoted:
+        # upload in a separate thread, upload waits for the executor
+        thread = threading.Thread(target=self.upload)
+        thread.daemon = True
+        thread.start()
+      for (name,active,dueTime) in due:
+        self.__executor.submit(self.__fire,name,active,dueTime)
+
+  # run event loop in a background thread   ---------------------------------
+
+  def start(self):
+    self.__thread = threading.Thread(target=self.run)
+    self.__thread.daemon = True
+    self.__thread.start()
+    return self
+
+  # stop event loop   ---------------------------------------------------------
+
+  def stop(self):
+    with self.__cond:
+      self.__stopped = True
+      self.__cond.notify()
+    if self.__thread is not None:
+      self.__thread.join()
+      self.__thread = None
+
+  # stop event loop and executor   --------------------------------------------
+
+  def shutdown(self,wait=True):
+    self.stop()
+    self.__executor.shutdown(wait)
@@ -0,0 +1,315 @@
+#!/usr/bin/python
+
+# Class definition of Simulator
+#
+# Simulator runs virtual plugs speaking the smartplug.cgi protocol on the
+# local host, e.g. for benchmarks and tests without hardware. Every virtual
+# plug has its own HTTP server (on its own port or loopback address) and
+# implements SYSTEM_INFO, the power state, the schedule and NOW_POWER. The
+# simulator checks basic authentication and injects latency, jitter and
+# errors.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+import sys
+import time
+import random
+import base64
+import threading
+
+from Codec import Codec as Codec
+
+class Simulator(object):
+  """Virtual plugs for testing without hardware"""
+
+  RESPONSE = '<?xml version="1.0" encoding="UTF8"?>' + \
+             '<SMARTPLUG id="edimax"><CMD id="%s">%s</CMD></SMARTPLUG>'
+  SCHEDULE = 'Device.System.Power.Schedule.'
+  OFF      = '0'*360                    # transport-format of an off-day
+
+  _server  = None                       # HTTP server class (see _getServer)
+
+  # return class of the threaded HTTP server of a virtual plug   -----------
+  # (created on first use, so importing ediplug does not import the
+  # http-server modules)
+
+  @staticmethod
+  def _getServer():
+    if Simulator._server is not None:
+      return Simulator._server
+    import BaseHTTPServer
+    import SocketServer
+
+    class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+      """answer commands of a virtual plug"""
+
+      protocol_version = 'HTTP/1.1'
+      disable_nagle_algorithm = True
+
+      def do_POST(self):
+        self.server.simulator._handle(self)
+
+      def log_message(self,format,*args):
+        pass
+
+    class _Server(SocketServer.ThreadingMixIn,BaseHTTPServer.HTTPServer):
+      """threaded HTTP server of a virtual plug"""
+
+      daemon_threads = True
+      allow_reuse_address = True
+      handler = _Handler
+
+      # ignore errors of clients (e.g. closing the connection after a timeout)
+
+      def handle_error(self,request,client_address):
+        pass
+
+    Simulator._server = _Server
+    return _Server
+
+  # initialize Simulator object   --------------------------------------------
+  # (without hosts, count plugs listen on host with consecutive ports
+  # (port=0: any free port), with hosts one plug listens on every host)
+
+  def __init__(self,count=1,host='127.0.0.1',port=0,hosts=None,
+               model='SP2101W',user='admin',password='1234',
+               latency=0.0,jitter=0.0,errorRate=0.0,seed=None):
+    if hosts is None:
+      self.__addresses = [(host,port+i if port else 0) for i in range(count)]
+    else:
+      self.__addresses = [(h,port) for h in hosts]
+    self.__model     = model
+    self.__auth      = 'Basic ' + base64.b64encode('%s:%s' % (user,password))
+    self.__latency   = latency
+    self.__jitter    = jitter
+    self.__errorRate = errorRate
+    self.__random    = random.Random(seed)
+    self.__servers   = []
+    self.__lock      = threading.Lock()
+    self.__stats     = {'requests': 0, 'errors': 0, 'unauthorized': 0}
+
+  # technical representation of simulator   -----------------------------------
+
+  def __repr__(self):
+    return "<Simulator: %d plugs, model: %s>" % (len(self.__addresses),
+                                                 self.__model)
+
+  # start all virtual plugs   -------------------------------------------------
+
+  def start(self):
+    serverClass = Simulator._getServer()
+    for i, address in enumerate(self.__addresses):
+      server = serverClass(address,serverClass.handler)
+      server.simulator = self
+      server.plug = {
+        'Device.System.Name': 'sim%03d' % i,
+        'Run.Model': self.__model,
+        'Run.Cus': 'Edimax',
+        'Run.FW.Version': '2.04',
+        'Run.LAN.Client.MAC.Address': '74DA38%06X' % i,
+        'state': False,
+        'schedule': [Simulator.OFF]*7,
+        'list': ['']*7,
+        'energy': 0.0,
+        'lock': threading.Lock()
+        }
+      thread = threading.Thread(target=server.serve_forever)
+      thread.daemon = True
+      thread.start()
+      self.__servers.append(server)
+    return self
+
+  # stop all virtual plugs   --------------------------------------------------
+
+  def stop(self):
+    for server in self.__servers:
+      server.shutdown()
+      server.server_close()
+    self.__servers = []
+
+  # return (host,port) of all virtual plugs   --------------------------------
+
+  def getAddresses(self):
+    return [server.server_address for server in self.__servers]
+
+  # return map name -> Plug of all virtual plugs   ---------------------------
+
+  def getPlugs(self,user='admin',password='1234',session=None):
+    from PlugFinder import PlugFinder
+    from Plug import Plug
+    plugs = {}
+    for server in self.__servers:
+      host, port = server.server_address
+      cls = PlugFinder.MODELS.get(server.plug['Run.Model'],Plug)
+      plugs[server.plug['Device.System.Name']] = cls(host,port,user,password,
+                                                     session)
+    return plugs
+
+  # return state of a virtual plug (power state and schedule)   -------------
+
+  def getState(self,name):
+    plug = self.__find(name)
+    with plug['lock']:
+      return {'state': plug['state'], 'schedule': list(plug['schedule'])}
+
+  # switch a virtual plug directly (like the button of the plug)   ----------
+  # (the change is not counted as a request)
+
+  def setPowerState(self,name,active):
+    plug = self.__find(name)
+    with plug['lock']:
+      plug['state'] = bool(active)
+
+  # return the state-map of a virtual plug   ----------------------------------
+
+  def __find(self,name):
+    for server in self.__servers:
+      if server.plug['Device.System.Name'] == name:
+        return server.plug
+    raise KeyError(name)
+
+  # return statistics of the simulator   --------------------------------------
+
+  def getStats(self):
+    with self.__lock:
+      return dict(self.__stats)
+
+  # count an event   ----------------------------------------------------------
+
+  def __count(self,key):
+    with self.__lock:
+      self.__stats[key] += 1
+
+  # send a response   ---------------------------------------------------------
+
+  @staticmethod
+  def __send(handler,status,text='',headers=None):
+    handler.send_response(status)
+    for name, value in (headers or {}).items():
+      handler.send_header(name,value)
+    handler.send_header('Content-Type','text/xml')
+    handler.send_header('Content-Length',str(len(text)))
+    handler.end_headers()
+    handler.wfile.write(text)
+
+  # extract the command-document from the (multipart) request body   --------
+
+  @staticmethod
+  def _extract(body):
+    start = body.find('<?xml')
+    if start < 0:
+      start = body.find('<SMARTPLUG')
+    end = body.find('</SMARTPLUG>')
+    if start < 0 or end < 0:
+      raise ValueError("no command document in request")
+    return body[start:end+len('</SMARTPLUG>')]
+
+  # handle a request (called by the handler of a virtual plug)   ------------
+
+  def _handle(self,handler):
+    body = handler.rfile.read(int(handler.headers.getheader('content-length')))
+    self.__count('requests')
+    with self.__lock:
+      delay = self.__latency + self.__random.uniform(0,self.__jitter)
+      error = self.__random.random() < self.__errorRate
+    if delay:
+      time.sleep(delay)
+
+    if handler.headers.getheader('authorization') <> self.__auth:
+      self.__count('unauthorized')
+      Simulator.__send(handler,401,'',
+                       {'WWW-Authenticate': 'Basic realm="SP2101W"'})
+      return
+    if error:
+      self.__count('errors')
+      Simulator.__send(handler,500)
+      return
+    try:
+      cmd = Codec.find(Codec.parse(Simulator._extract(body)),"CMD")
+    except Exception:
+      self.__count('errors')
+      Simulator.__send(handler,400)
+      return
+
+    plug = handler.server.plug
+    with plug['lock']:
+      if cmd.get('id') == 'setup':
+        for tag in cmd:
+          self.__setup(plug,tag)
+        text = 'OK'
+      else:
+        text = ''.join([self.__get(plug,tag) for tag in cmd])
+    Simulator.__send(handler,200,Simulator.RESPONSE % (cmd.get('id'),text))
+
+  # answer a single query (unknown tags are returned empty)   -----------------
+
+  def __get(self,plug,tag):
+    if tag.tag == 'SYSTEM_INFO':
+      value = ''.join([Codec.element(key,plug[key]) for key in
+                       ['Run.Cus','Run.Model','Run.FW.Version',
+                        'Run.LAN.Client.MAC.Address','Device.System.Name']])
+    elif tag.tag == 'Device.System.Power.State':
+      value = 'ON' if plug['state'] else 'OFF'
+    elif tag.tag == 'NOW_POWER':
+      if plug['state']:
+        current = 0.22 + self.__random.uniform(-0.01,0.01)
+      else:
+        current = 0.0
+      plug['energy'] += current*230/3600000
+      value = ''.join([
+        Codec.element('Device.System.Power.LastToggleTime','20261018120000'),
+        Codec.element('Device.System.Power.NowCurrent','%.4f' % current),
+        Codec.element('Device.System.Power.NowPower','%.2f' % (current*230)),
+        Codec.element('Device.System.Power.NowEnergy.Day',
+                                                    '%.3f' % plug['energy']),
+        Codec.element('Device.System.Power.NowEnergy.Week',
+                                                    '%.3f' % plug['energy']),
+        Codec.element('Device.System.Power.NowEnergy.Month',
+                                                    '%.3f' % plug['energy'])])
+    elif tag.tag == 'SCHEDULE':
+      days = [int(child.tag[len(Simulator.SCHEDULE):]) for child in tag
+                                     if not child.tag.endswith('.List')]
+      if not days:
+        days = range(7)
+      value = ''.join(
+        [Codec.element(Simulator.SCHEDULE+str(d),plug['schedule'][d],
+                       {'value': 'ON'}) +
+         Codec.element(Simulator.SCHEDULE+str(d)+'.List',plug['list'][d])
+                                                             for d in days])
+    else:
+      return Codec.element(tag.tag)
+    return '<%s>%s</%s>' % (tag.tag,value,tag.tag)     # value is XML
+
+  # execute a single setup command   -----------------------------------------
+
+  def __setup(self,plug,tag):
+    if tag.tag == 'Device.System.Power.State':
+      plug['state'] = tag.text == 'ON'
+    elif tag.tag == 'SCHEDULE':
+      for child in tag:
+        name = child.tag[len(Simulator.SCHEDULE):]
+        if name.endswith('.List'):
+          plug['list'][int(name[:-5])] = child.text or ''
+        else:
+          plug['schedule'][int(name)] = child.text or Simulator.OFF
+
+# -----------------------------------------------------------------------------
+# run virtual plugs until interrupted   ---------------------------------------
+
+if __name__ == "__main__":
+  count = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+  port  = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+  sim   = Simulator(count,port=port).start()
+  for host, port in sim.getAddresses():
+    print "virtual plug: %s:%d" % (host,port)
+  try:
+    while True:
+      time.sleep(1)
+  except KeyboardInterrupt:
+    sim.stop()
@@ -2,7 +2,9 @@
 
 # Class definition of TPoint
 #
-# TPoint represents a timepoint (minute) in the weekly schedule
+# TPoint represents a timepoint (minute) in the weekly schedule. It is an
+# immutable value backed by the minute of the week, so it can be compared,
+# hashed and used as key of a dict or as member of a set.
 #
 # This file is part of the project https://github.com/bablokb/ediplug
 #
@@ -10,13 +12,18 @@
 # License: GPL v3
 #
 
-from datetime import datetime
+from datetime import datetime, timedelta
+
+WEEK = 10080                            # minutes per week
+DAY  = 1440                             # minutes per day
 
 class TPoint(object):
   """Timepoint data-object"""
 
+  __slots__ = ('__index',)
+
   # symbolic names for weekdays   --------------------------------------------
-  
+
   SUN = 0
   MON = 1
   TUE = 2
@@ -26,118 +33,191 @@ class TPoint(object):
   SAT = 6
 
   # names of days (should be localized)   ------------------------------------
-  
+
   DAYS = [ 'Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat' ]
 
   # translation-code for TPoint to transport-format   ------------------------
-  
+
   TCODE="0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
   #      012345678901234567890123456789012345678901234567890123456789
   #                1         2         3         4         5
 
-  # normalize index to valid range   -----------------------------------------
+  # transport-format of all minutes of a day (index: hour*60+minute)   -----
 
-  @staticmethod
-  def _normalizeIndex(index):
-    day = (index) // 1440
-    hour = (index - day*1440) // 60
-    minute = (index - day*1440 - hour*60)
-    return (day,hour,minute)
-      
-  # create day,hour,min for arbitrary input   --------------------------------
+  TRANSPORT = [TCODE[hour] + TCODE[minute] for hour in range(24)
+                                            for minute in range(60)]
+
+  # interned instances (created on demand, there is at most one instance
+  # per minute of the week)   ------------------------------------------------
+
+  _points = [None]*WEEK
+
+  # convert a duration (minutes or timedelta) to minutes   -------------------
 
   @staticmethod
-  def _normalize(day,hour,minute):
-    index = (1440*day + 60*hour + minute ) % 10080
-    return TPoint._normalizeIndex(index)
+  def _minutes(duration):
+    if isinstance(duration,timedelta):
+      return duration.days*DAY + duration.seconds//60
+    return int(duration)
 
-  # return TPoint for a given index   ----------------------------------------
+  # return (interned) TPoint for a given index   -----------------------------
 
   @staticmethod
   def create(index):
-    day,hour,minute = TPoint._normalizeIndex(index)
-    return TPoint(day,hour,minute)
-  
+    index = index % WEEK
+    tp = TPoint._points[index]
+    if tp is None:
+      tp = object.__new__(TPoint)
+      tp.__index = index
+      TPoint._points[index] = tp
+    return tp
+
+  # return TPoint for a datetime   -------------------------------------------
+
+  @staticmethod
+  def fromDatetime(dt):
+    return TPoint.create((dt.isoweekday() % 7)*DAY + dt.hour*60 + dt.minute)
+
   # return TPoint for "now"   ------------------------------------------------
 
   @staticmethod
   def now():
-    now = datetime.today()
-    return TPoint(now.isoweekday() % 7,now.hour,now.minute)
+    return TPoint.fromDatetime(datetime.today())
+
+  # iterate over the range [start,end) with the given step   ----------------
+  # (the range wraps around the end of the week, start == end is empty)
+
+  @staticmethod
+  def range(start,end,step=1):
+    step  = TPoint._minutes(step)
+    if step <= 0:
+      raise ValueError("step must be positive")
+    index = start.__index
+    count = (end.__index - index) % WEEK
+    for offset in xrange(0,count,step):
+      yield TPoint.create(index+offset)
+
+  # Constructor passing day, hour, minute (returns the interned instance)  --
 
-  # Constructor passing day, hour, minute   ----------------------------------
-  
-  def __init__(self,day,hour,minute):
-    self.__Day, self.__Hour, self.__Minute = TPoint._normalize(day,hour,minute)
+  def __new__(cls,day,hour,minute):
+    return TPoint.create(DAY*day + 60*hour + minute)
+
+  # pickle support (unpickled TPoints are interned)   ------------------------
+
+  def __reduce__(self):
+    return (TPoint,(self.day,self.hour,self.minute))
 
   # repr function   ---------------------------------------------------------
-  
+
   def __repr__(self):
     return "<TPoint day:%s, hour:%s, minute:%s>" % \
-           (self.__Day,self.__Hour,self.__Minute)
+           (self.day,self.hour,self.minute)
 
   # pretty print as string   ------------------------------------------------
 
   def __str__(self):
-    return "%s %02d:%02d" % (TPoint.DAYS[self.__Day],self.__Hour,self.__Minute)
+    return "%s %02d:%02d" % (TPoint.DAYS[self.day],self.hour,self.minute)
 
   # getter for day   --------------------------------------------------------
 
   @property
   def day(self):
-    return self.__Day
+    return self.__index // DAY
 
-  # setter for day   --------------------------------------------------------
-
-  @day.setter
-  def day(self,day):
-    self.__Day = day
-  
   # getter for hour   -------------------------------------------------------
 
   @property
   def hour(self):
-    return self.__Hour
-
-  # setter for hour   -------------------------------------------------------
+    return (self.__index % DAY) // 60
 
-  @hour.setter
-  def hour(self,hour):
-    self.__Hour = hour
-  
   # getter for minute   -----------------------------------------------------
 
   @property
   def minute(self):
-    return self.__Minute
+    return self.__index % 60
 
-  # setter for minute   -----------------------------------------------------
-
-  @minute.setter
-  def minute(self,minute):
-    self.__Minute = minute
-  
   # convert to transport   --------------------------------------------------
 
   def toTransport(self):
-    return TPoint.TCODE[self.__Hour] + TPoint.TCODE[self.__Minute]
-  
+    return TPoint.TRANSPORT[self.__index % DAY]
+
   # return flat index of TPoint in weekly schedule   ------------------------
-  
+
   def getIndex(self):
-    return self.__Day*1440 + self.__Hour*60 + self.__Minute
+    return self.__index
+
+  # return next datetime at or after the reference (default: now)   --------
+
+  def toDatetime(self,reference=None):
+    if reference is None:
+      reference = datetime.today()
+    reference = reference.replace(second=0,microsecond=0)
+    delta = (self.__index - TPoint.fromDatetime(reference).__index) % WEEK
+    return reference + timedelta(minutes=delta)
 
   # return TPoint after given duration   ------------------------------------
-  
+
   def createAfter(self,days,hours,minutes):
-    newIndex = (self.getIndex() + 1440*days + 60*hours + minutes) % 10080
-    return TPoint.create(newIndex)
+    return TPoint.create(self.__index + DAY*days + 60*hours + minutes)
+
+  # removed: add changed the TPoint in place, but TPoint is immutable   ----
+  # (raises, so callers relying on the side effect fail instead of silently
+  # keeping the old value)
 
-  # add duration to TPoint   ------------------------------------------------
-  
   def add(self,days,hours,minutes):
-    self.__init__(self.__Day+days,self.__Hour+hours,self.__Minute+minutes)
-    return self
+    raise TypeError("TPoint is immutable, use createAfter() or + instead "
+                    "of add()")
+
+  # arithmetic: TPoint + duration, TPoint - duration, TPoint - TPoint   -----
+  # (durations are minutes or timedelta, the difference of two TPoints is
+  # the timedelta from the other TPoint forward to this one)
+
+  def __add__(self,duration):
+    if isinstance(duration,TPoint):
+      return NotImplemented
+    return TPoint.create(self.__index + TPoint._minutes(duration))
+
+  __radd__ = __add__
+
+  def __sub__(self,other):
+    if isinstance(other,TPoint):
+      return timedelta(minutes=(self.__index - other.__index) % WEEK)
+    return TPoint.create(self.__index - TPoint._minutes(other))
+
+  # comparison (by position within the week)   -------------------------------
+
+  def __eq__(self,other):
+    if not isinstance(other,TPoint):
+      return NotImplemented
+    return self.__index == other.__index
+
+  def __ne__(self,other):
+    if not isinstance(other,TPoint):
+      return NotImplemented
+    return self.__index <> other.__index
+
+  def __lt__(self,other):
+    if not isinstance(other,TPoint):
+      return NotImplemented
+    return self.__index < other.__index
+
+  def __le__(self,other):
+    if not isinstance(other,TPoint):
+      return NotImplemented
+    return self.__index <= other.__index
+
+  def __gt__(self,other):
+    if not isinstance(other,TPoint):
+      return NotImplemented
+    return self.__index > other.__index
+
+  def __ge__(self,other):
+    if not isinstance(other,TPoint):
+      return NotImplemented
+    return self.__index >= other.__index
+
+  def __hash__(self):
+    return self.__index
 
 # test   ---------------------------------------------------------------------
 
@@ -154,12 +234,16 @@ if __name__ == "__main__":
   #tp2 = tp.createAfter(0,0,0)
   print "tp2 = tp.createAfter(-1,-1,-5): %s" % tp2
   print "tp2.toTransport(): %s" % tp2.toTransport()
-  
+  print "tp - tp2: %s" % (tp - tp2)
+  print "tp2 + timedelta(hours=2): %s" % (tp2 + timedelta(hours=2))
+
   now = TPoint.now()
   print "now: %s" % now
   print "now.toTransport(): %s" % now.toTransport()
   print "now (day number): %d" % now.day
-  
-  now.day = TPoint.TUE
+  print "now as datetime: %s" % now.toDatetime()
+
+  now = TPoint(TPoint.TUE,now.hour,now.minute)
   print "now on Tuesday: %s" % now
-  
+  print "next four hours: %s" % \
+    [str(t) for t in TPoint.range(now,now+240,timedelta(hours=1))]
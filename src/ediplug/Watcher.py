@@ -0,0 +1,265 @@
+#!/usr/bin/python
+
+# Class definition of Watcher
+#
+# Watcher polls the state of plugs and reports changes: the power state
+# (switched by software or with the button of the plug), the power draw
+# crossing a threshold (SP2101W only) and the plug going offline or coming
+# back. The poll interval of every plug adapts to its activity: it drops to
+# minInterval after a change and grows up to maxInterval while the plug is
+# idle. Polls are spread in time (random first poll within maxInterval and
+# a jittered interval), so the requests do not burst. Changes are
+# debounced: a new value is only reported once it has been stable for
+# debounce seconds.
+#
+# This file is part of the project https://github.com/bablokb/ediplug
+#
+# Copyright: Bernhard Bablok
+# License: GPL v3
+#
+
+__author__ = "Bernhard Bablok, https://github.com/bablokb"
+
+import time
+import heapq
+import bisect
+import random
+import itertools
+import threading
+import Queue
+
+from Executor import Executor as Executor
+from PowerSampler import PowerSampler as PowerSampler
+
+class Watcher(object):
+  """Poll plugs and report changes of their state"""
+
+  POWER = 'Device.System.Power.NowPower'
+
+  # initialize Watcher object   ----------------------------------------------
+  # (plugs is a map name -> plug, e.g. the result of PlugFinder.search,
+  # thresholds is a list of power values in watts, None disables watching
+  # the power draw)
+
+  def __init__(self,plugs,minInterval=1.0,maxInterval=30.0,backoff=2.0,
+               jitter=0.1,debounce=0.0,thresholds=None,workers=16,
+               executor=None,seed=None):
+    self.__plugs       = dict(plugs)
+    self.__minInterval = minInterval
+    self.__maxInterval = maxInterval
+    self.__backoff     = backoff
+    self.__jitter      = jitter
+    self.__debounce    = debounce
+    self.__thresholds  = sorted(thresholds) if thresholds is not None \
+                                                                    else None
+    if executor is None:
+      executor = Executor(max(1,min(workers,len(self.__plugs))))
+    self.__executor    = executor
+    self.__random      = random.Random(seed)
+    self.__callbacks   = []
+    self.__heap        = []             # [due,seq,name]
+    self.__seq         = itertools.count()
+    self.__states      = {}
+    self.__cond        = threading.Condition()
+    self.__stopped     = False
+    self.__thread      = None
+    self.__stats       = {'polls': 0, 'errors': 0, 'events': 0,
+                          'callbackErrors': 0}
+
+    # spread the first polls of all plugs over the maximal interval
+    now = time.time()
+    for name in self.__plugs:
+      self.__states[name] = {'known': {}, 'candidates': {},
+                             'interval': minInterval, 'busy': False}
+      heapq.heappush(self.__heap,[now + self.__random.uniform(0,maxInterval),
+                                  next(self.__seq),name])
+
+  # technical representation of watcher   -------------------------------------
+
+  def __repr__(self):
+    return "<Watcher: %d plugs, interval: %s-%s>" % (len(self.__plugs),
+                                    self.__minInterval,self.__maxInterval)
+
+  # add callback, called with a map describing every change   ---------------
+
+  def addCallback(self,callback):
+    with self.__cond:
+      self.__callbacks.append(callback)
+
+  # remove callback   ---------------------------------------------------------
+
+  def removeCallback(self,callback):
+    with self.__cond:
+      self.__callbacks.remove(callback)
+
+  # return known state of a plug   --------------------------------------------
+  # (map with the keys state, level, power, online and interval, values are
+  # missing until they are known)
+
+  def getState(self,name):
+    with self.__cond:
+      state = self.__states[name]
+      result = dict(state['known'])
+      if 'power' in state:
+        result['power'] = state['power']
+      result['interval'] = state['interval']
+    return result
+
+  # return statistics   -------------------------------------------------------
+
+  def getStats(self):
+    with self.__cond:
+      return dict(self.__stats)
+
+  # schedule next poll of a plug (called with lock held)   -----------------
+
+  def __schedule(self,name,due):
+    heapq.heappush(self.__heap,[due,next(self.__seq),name])
+    self.__cond.notify()
+
+  # query state of a plug (executed by a worker)   ---------------------------
+  # (returns map kind -> value)
+
+  def __query(self,plug):
+    if self.__thresholds is None or not hasattr(plug,'_parsePowerInfo'):
+      return {'state': plug.getPowerState()}, None
+    results = plug.batch().powerState().powerInfo().execute()
+    power = PowerSampler.convert(results['powerInfo'],
+                                 [Watcher.POWER]).get(Watcher.POWER)
+    values = {'state': results['powerState']}
+    if power is not None:
+      values['level'] = bisect.bisect_right(self.__thresholds,power)
+    return values, power
+
+  # poll a plug and detect changes (executed by a worker)   -----------------
+
+  def __poll(self,name):
+    try:
+      values, power = self.__query(self.__plugs[name])
+      values['online'] = True
+      error = None
+    except Exception as e:
+      values, power = {'online': False}, None
+      error = e
+
+    now    = time.time()
+    events = []
+    with self.__cond:
+      self.__stats['polls']  += 1
+      self.__stats['errors'] += error is not None
+      state      = self.__states[name]
+      known      = state['known']
+      candidates = state['candidates']
+      if power is not None:
+        state['power'] = power
+      for kind, value in sorted(values.items()):
+        if kind not in known:
+          known[kind] = value           # first value: no event
+          continue
+        if value == known[kind]:
+          candidates.pop(kind,None)
+          continue
+        candidate = candidates.get(kind)
+        if candidate is None or candidate[0] <> value:
+          candidate = candidates[kind] = (value,now)
+        if now - candidate[1] >= self.__debounce:
+          events.append({'plug': name, 'kind': kind, 'old': known[kind],
+                         'new': value, 'power': power, 'time': now,
+                         'error': error})
+          known[kind] = value
+          del candidates[kind]
+
+      # adapt interval: fast after a change (or while a change is pending),
+      # slower while the plug is idle
+      if events or candidates:
+        state['interval'] = self.__minInterval
+      else:
+        state['interval'] = min(self.__maxInterval,
+                                state['interval']*self.__backoff)
+      delay = state['interval']*self.__random.uniform(1-self.__jitter,
+                                                      1+self.__jitter)
+      if candidates and self.__debounce:
+        pending = min([c[1] for c in candidates.values()]) + self.__debounce
+        delay = max(0.0,min(delay,pending - now))
+      self.__schedule(name,now + delay)
+      state['busy'] = False
+      self.__stats['events'] += len(events)
+      callbacks = list(self.__callbacks)
+
+    # a failing callback must not hide the event from the others
+    for event in events:
+      for callback in callbacks:
+        try:
+          callback(event)
+        except Exception:
+          with self.__cond:
+            self.__stats['callbackErrors'] += 1
+
+  # polling loop (until: timestamp, None: until stopped)   -------------------
+
+  def run(self,until=None):
+    while True:
+      with self.__cond:
+        while True:
+          if self.__stopped:
+            self.__stopped = False
+            return
+          now = time.time()
+          if until is not None and now >= until:
+            return
+          due = []
+          while self.__heap and self.__heap[0][0] <= now:
+            name  = heapq.heappop(self.__heap)[2]
+            state = self.__states[name]
+            if not state['busy']:
+              state['busy'] = True
+              due.append(name)
+          if due:
+            break
+          wait = self.__heap[0][0] - now if self.__heap else None
+          if until is not None:
+            wait = until - now if wait is None else min(wait,until - now)
+          self.__cond.wait(wait)
+      for name in due:
+        self.__executor.submit(self.__poll,name)
+
+  # return changes as they occur   --------------------------------------------
+  # (generator, stops after timeout seconds without changes, with timeout
+  # None only when the generator is closed)
+
+  def events(self,timeout=None):
+    queue = Queue.Queue()
+    self.addCallback(queue.put)
+    try:
+      while True:
+        try:
+          yield queue.get(True,timeout if timeout is not None else 1.0)
+        except Queue.Empty:
+          if timeout is not None:
+            return
+    finally:
+      self.removeCallback(queue.put)
+
+  # run polling loop in a background thread   ---------------------------------
+
+  def start(self):
+    self.__thread = threading.Thread(target=self.run)
+    self.__thread.daemon = True
+    self.__thread.start()
+    return self
+
+  # stop polling loop   -------------------------------------------------------
+
+  def stop(self):
+    with self.__cond:
+      self.__stopped = True
+      self.__cond.notify()
+    if self.__thread is not None:
+      self.__thread.join()
+      self.__thread = None
+
+  # stop polling loop and executor   ------------------------------------------
+
+  def shutdown(self,wait=True):
+    self.stop()
+    self.__executor.shutdown(wait)
@@ -4,3 +4,28 @@ from Schedule import Schedule as Schedule
 from SP1101W import SP1101W as SP1101W
 from SP2101W import SP2101W as SP2101W
 from TPoint import TPoint as TPoint
+from PlugSession import PlugSession as PlugSession
+from Executor import Executor as Executor
+from Executor import Future as Future
+from AsyncPlug import AsyncPlug as AsyncPlug
+from AsyncSP2101W import AsyncSP2101W as AsyncSP2101W
+from Batch import Batch as Batch
+from DiscoveryCache import DiscoveryCache as DiscoveryCache
+from Codec import Codec as Codec
+from RingBuffer import RingBuffer as RingBuffer
+from PowerSampler import PowerSampler as PowerSampler
+from PowerStore import PowerStore as PowerStore
+from Fleet import Fleet as Fleet
+from Simulator import Simulator as Simulator
+from Metrics import Metrics as Metrics
+from PlugError import PlugError as PlugError
+from PlugError import PlugConnectionError as PlugConnectionError
+from PlugError import PlugTimeoutError as PlugTimeoutError
+from PlugError import PlugUnavailableError as PlugUnavailableError
+from PlugError import PlugHTTPError as PlugHTTPError
+from PlugError import PlugAuthError as PlugAuthError
+from PlugError import PlugResponseError as PlugResponseError
+from CircuitBreaker import CircuitBreaker as CircuitBreaker
+from Scheduler import Scheduler as Scheduler
+from LazyModule import LazyModule as LazyModule
+from Watcher import Watcher as Watcher
@@ -26,7 +26,7 @@ if __name__ == '__main__':
 
   # process arguments
   try:
-    pf = PlugFinder(password=args['password'])
+    pf = PlugFinder(password=args['password'],cache=DiscoveryCache())
     plug = pf.search(maxCount=1).values()[0]
     if args['state'] <> "":
       plug.setPowerState(True if args['state'].lower() == 'on' else False)
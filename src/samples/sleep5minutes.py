@@ -37,7 +37,7 @@ if __name__ == "__main__":
   
   try:
     # find plug in given network
-    pf = PlugFinder(password=args['password'])
+    pf = PlugFinder(password=args['password'],cache=DiscoveryCache())
     if len(args['net']):
       plugs = pf.search(args['net'],maxCount=1)
     else:
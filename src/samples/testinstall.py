@@ -21,7 +21,8 @@ try:
     # define a schedule and print it
     sched = Schedule(active=False)
     sched.setState(on,off,active=True)
-    sched.setState(on.add(0,3,0),off.add(0,3,0),active=True)
+    sched.setState(on.createAfter(0,3,0),off.createAfter(0,3,0),
+                   active=True)
 
     for (tp,val) in  sched.getSwitchList(on.day):
         print "%s: %s" % (tp, 'ON' if val=='1' else 'OFF')